@@ -0,0 +1,174 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+
+import numpy as np
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Distance statistics for the co-star network."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--cache", nargs="?", const="", metavar="PATH",
+        help="load from (or write) a binary snapshot of the data"
+    )
+    parser.add_argument(
+        "--seed", action="append", default=[], metavar="PERSON",
+        help="name or IMDB id to measure distances from; repeat for a "
+             "multi-source histogram (distance to the nearest seed)"
+    )
+    parser.add_argument(
+        "--sample", type=int, default=0, metavar="N",
+        help="estimate eccentricity and diameter from N random people"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes for --sample"
+    )
+    parser.add_argument("--random-seed", type=int, default=None)
+    args = parser.parse_args()
+    cache = args.cache
+    if cache == "":
+        cache = os.path.join(args.directory, "graph.snapshot")
+    if not args.seed and not args.sample:
+        parser.error("nothing to do: give --seed and/or --sample")
+
+    print("Loading data...")
+    degrees.load_data(args.directory, cache)
+    print("Data loaded.")
+
+    if args.seed:
+        seeds = []
+        for text in args.seed:
+            person_id, error = degrees.resolve_person(text)
+            if error is not None:
+                sys.exit(error)
+            seeds.append(degrees.graph.person_index[person_id])
+        print_histogram(histogram(seeds))
+
+    if args.sample:
+        rng = random.Random(args.random_seed)
+        people = rng.sample(range(degrees.graph.num_people()),
+                            min(args.sample, degrees.graph.num_people()))
+        eccentricities = sample_eccentricity(
+            people, args.workers, args.directory, cache
+        )
+        print_eccentricity(eccentricities)
+
+
+def csr_arrays():
+    """
+    Returns NumPy views over the graph's CSR arrays without copying.
+    """
+    graph = degrees.graph
+    return (np.frombuffer(graph.person_offsets, dtype=np.int32),
+            np.frombuffer(graph.person_movies, dtype=np.int32),
+            np.frombuffer(graph.movie_offsets, dtype=np.int32),
+            np.frombuffer(graph.movie_people, dtype=np.int32))
+
+
+def gather(offsets, indices, nodes):
+    """
+    Returns the concatenated CSR rows of `nodes` as one array.
+    """
+    starts = offsets[nodes]
+    counts = offsets[nodes + 1] - starts
+    if len(counts) == 0:
+        return indices[:0]
+
+    # Position k of the output reads indices[starts[row] + (k - row start)]
+    shifts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+    return indices[shifts + np.arange(shifts.size)]
+
+
+def bfs_levels(seeds):
+    """
+    Level-synchronous breadth-first search from every seed at once.
+    Returns the number of people first reached at each distance and
+    the people on the last level.
+
+    Each level is expanded with whole-array operations, using boolean
+    masks as visited sets for people and for already scanned movies.
+    """
+    person_offsets, person_movies, movie_offsets, movie_people = csr_arrays()
+    visited = np.zeros(degrees.graph.num_people(), dtype=bool)
+    movie_seen = np.zeros(degrees.graph.num_movies(), dtype=bool)
+
+    frontier = np.unique(np.asarray(seeds, dtype=np.int32))
+    visited[frontier] = True
+    levels = [len(frontier)]
+    while True:
+
+        # Movies of the frontier not scanned on an earlier level
+        movies = gather(person_offsets, person_movies, frontier)
+        movies = np.unique(movies[~movie_seen[movies]])
+        movie_seen[movies] = True
+
+        # Stars of those movies not reached yet form the next level
+        people = gather(movie_offsets, movie_people, movies)
+        people = np.unique(people[~visited[people]])
+        if len(people) == 0:
+            return levels, frontier
+        visited[people] = True
+        levels.append(len(people))
+        frontier = people
+
+
+def histogram(seeds):
+    """
+    Returns the number of people at each distance from the nearest seed.
+    """
+    levels, _ = bfs_levels(seeds)
+    return levels
+
+
+def eccentricity(person):
+    """
+    Returns a person's eccentricity within their component, and the
+    eccentricity of one of the people farthest from them. The larger of
+    the two is a tighter lower bound on the component's diameter.
+    """
+    levels, farthest = bfs_levels([person])
+    sweep, _ = bfs_levels([int(farthest[0])])
+    return len(levels) - 1, len(sweep) - 1
+
+
+def sample_eccentricity(people, workers, directory, cache):
+    """
+    Runs eccentricity() for each sampled person across a process pool.
+    """
+    pool = multiprocessing.Pool(
+        workers, initializer=degrees.init_worker, initargs=(directory, cache)
+    )
+    with pool:
+        return pool.map(eccentricity, people)
+
+
+def print_histogram(levels):
+    total = degrees.graph.num_people()
+    reached = 0
+    print("Distance  People  Fraction  Cumulative")
+    for distance, count in enumerate(levels):
+        reached += count
+        print(f"{distance:>8}  {count:>6}  {count / total:>8.4f}  "
+              f"{reached / total:>10.4f}")
+    print(f"Unreachable: {total - reached} of {total}")
+
+
+def print_eccentricity(eccentricities):
+    sampled = [first for first, _ in eccentricities]
+    print(f"Sampled {len(sampled)} people")
+    print(f"Eccentricity: min {min(sampled)}, "
+          f"mean {sum(sampled) / len(sampled):.2f}, max {max(sampled)}")
+    estimate = max(max(pair) for pair in eccentricities)
+    print(f"Diameter estimate (lower bound): {estimate}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,143 @@
+import argparse
 import csv
+import heapq
+import io
+import json
+import multiprocessing
+import os
+import socketserver
 import sys
+import time
+from array import array
 
-from util import Node, StackFrontier, QueueFrontier
+from graph import Graph
+from lean import load_lean, peak_memory
+from nameindex import build_name_index, complete, fuzzy
+from snapshot import load_snapshot, save_snapshot, source_stamps
+from util import Node
 
-# Maps names to a set of corresponding person_ids
-names = {}
+# CSV files making up a dataset directory
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
 
-# Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
-people = {}
+# Interned co-star network: people, movies and CSR adjacency between them
+graph = Graph()
 
-# Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
-movies = {}
 
-
-def load_data(directory):
+def load_data(directory, cache=None, lean=False):
     """
     Load data from CSV files into memory.
+
+    If `cache` is the path of a snapshot file, map the graph in from it
+    when it is up to date with the CSV files, otherwise parse the CSV
+    files and write a fresh snapshot there.
+
+    If `lean` is true, stream the files with lean.load_lean instead,
+    keeping as little as possible in memory.
     """
+    global graph
+    if lean:
+        if cache is not None:
+            raise ValueError("a lean load cannot be cached")
+        graph = load_lean(directory)
+        build_name_index(graph)
+        return
+    if cache is not None:
+        stamps = source_stamps(directory, SOURCES)
+        snapshot = load_snapshot(cache, stamps)
+        if snapshot is not None:
+            graph = snapshot
+            return
+
+    graph = Graph()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+            graph.add_person(row["id"], row["name"], row["birth"])
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+            graph.add_movie(row["id"], row["title"], row["year"])
 
     # Load stars
+    star_people = array("i")
+    star_movies = array("i")
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                person = graph.person_index[row["person_id"]]
+                movie = graph.movie_index[row["movie_id"]]
             except KeyError:
-                pass
+                continue
+            star_people.append(person)
+            star_movies.append(movie)
+    graph.build(star_people, star_movies)
+    build_name_index(graph)
+
+    if cache is not None:
+        save_snapshot(graph, cache, stamps)
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(
+        description="Find the degrees of separation between two actors."
+    )
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument(
+        "--cache", nargs="?", const="", metavar="PATH",
+        help="load from (or write) a binary snapshot of the data, "
+             "by default graph.snapshot in the data directory"
+    )
+    parser.add_argument(
+        "--lean", action="store_true",
+        help="stream the data, keeping only people and movies with stars "
+             "rows and reading births, titles and years from disk"
+    )
+    parser.add_argument(
+        "--batch", metavar="FILE",
+        help="answer one source,target pair per line of FILE "
+             "('-' for stdin) as JSON lines on stdout"
+    )
+    parser.add_argument(
+        "--socket", metavar="PATH",
+        help="answer source,target pairs sent over a Unix socket at PATH"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count(),
+        help="number of worker processes for --batch and --socket"
+    )
+    parser.add_argument(
+        "--all", action="store_true",
+        help="print every shortest path instead of just one"
+    )
+    parser.add_argument(
+        "--top", type=int, metavar="K",
+        help="print the K shortest paths with the most recent movies"
+    )
+    args = parser.parse_args()
+    if args.lean and args.cache is not None:
+        parser.error("--lean cannot be combined with --cache")
+    directory = args.directory
+    cache = args.cache
+    if cache == "":
+        cache = os.path.join(directory, "graph.snapshot")
+    serving = args.batch is not None or args.socket is not None
+
+    # Load data from files into memory; keep stdout clean for JSON results
+    log = sys.stderr if serving else sys.stdout
+    print("Loading data...", file=log)
+    load_data(directory, cache, args.lean)
+    print("Data loaded.", file=log)
+    if args.lean and peak_memory() is not None:
+        print(f"Peak memory: {peak_memory():.0f} MB", file=log)
 
-    # Load data from files into memory
-    print("Loading data...")
-    load_data(directory)
-    print("Data loaded.")
+    if serving:
+        serve(args, directory, cache, args.lean)
+        return
 
     source = person_id_for_name(input("Name: "))
     if source is None:
@@ -69,68 +146,423 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    if args.all or args.top is not None:
+        if args.top is not None:
+            paths = top_shortest_paths(source, target, args.top)
+        else:
+            paths = all_shortest_paths(source, target)
+        count = 0
+        for path in paths:
+            count += 1
+            print(f"Path {count}:")
+            print_path(source, path)
+        if count == 0:
+            print("Not connected.")
+        return
+
+    path = shortest_path(source, target, bidirectional=True)
 
     if path is None:
         print("Not connected.")
     else:
-        degrees = len(path)
-        print(f"{degrees} degrees of separation.")
-        path = [(None, source)] + path
-        for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
-            print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+        print_path(source, path)
+
+
+def print_path(source, path):
+    degrees = len(path)
+    print(f"{degrees} degrees of separation.")
+    path = [(None, source)] + path
+    for i in range(degrees):
+        person1 = graph.person_names[graph.person_index[path[i][1]]]
+        person2 = graph.person_names[graph.person_index[path[i + 1][1]]]
+        movie = graph.movie_titles[graph.movie_index[path[i + 1][0]]]
+        print(f"{i + 1}: {person1} and {person2} starred in {movie}")
+
+
+def serve(args, directory, cache, lean=False):
+    """
+    Answers many queries against the already loaded graph, either from
+    a file or stdin (--batch) or from Unix socket connections (--socket).
+    """
+    # Forked workers share the loaded graph; others have to load their own
+    pool = multiprocessing.Pool(
+        args.workers, initializer=init_worker,
+        initargs=(directory, cache, lean)
+    )
+    with pool:
+        if args.batch is not None:
+            if args.batch == "-":
+                answer_stream(pool, sys.stdin, sys.stdout)
+            else:
+                with open(args.batch, encoding="utf-8") as f:
+                    answer_stream(pool, f, sys.stdout)
+        else:
+            # Clear out a socket left behind by a server that was killed
+            if os.path.exists(args.socket):
+                os.remove(args.socket)
+            server = socketserver.ThreadingUnixStreamServer(
+                args.socket, QueryHandler
+            )
+            server.pool = pool
+            print(f"Listening on {args.socket}", file=sys.stderr)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+                os.remove(args.socket)
+
+
+def init_worker(directory, cache, lean=False):
+    if graph.num_people() == 0:
+        load_data(directory, cache, lean)
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the source,target lines sent over one socket connection.
+    """
+
+    def handle(self):
+        lines = io.TextIOWrapper(self.rfile, encoding="utf-8")
+        output = io.TextIOWrapper(self.wfile, encoding="utf-8",
+                                  write_through=True)
+        answer_stream(self.server.pool, lines, output)
+
+
+def answer_stream(pool, lines, output):
+    """
+    Reads source,target pairs (CSV, so names may be quoted) from `lines`
+    and writes one JSON result per pair to `output`, in input order,
+    as soon as each is ready.
+    """
+    rows = csv.reader(line for line in lines if line.strip())
+    for result in pool.imap(answer, rows):
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+
+
+def answer(row):
+    """
+    Answers a single batch query, returning a dict of the pair, the
+    path (or an error) and the time taken in milliseconds.
+    """
+    start = time.perf_counter()
+    result = {"source": None, "target": None}
+    if len(row) != 2:
+        result["error"] = "expected source,target"
+    else:
+        result["source"], result["target"] = row[0].strip(), row[1].strip()
+        source, error = resolve_person(row[0])
+        if error is None:
+            target, error = resolve_person(row[1])
+        if error is not None:
+            result["error"] = error
+        else:
+            path = shortest_path(source, target, bidirectional=True)
+            if path is None:
+                result["degrees"] = None
+                result["path"] = None
+            else:
+                result["degrees"] = len(path)
+                result["path"] = [list(step) for step in path]
+    result["ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+def resolve_person(text):
+    """
+    Non-interactive person_id_for_name for batch queries: accepts an
+    IMDB id or an unambiguous name. Returns (person_id, error).
+    """
+    text = text.strip()
+    if text in graph.person_index:
+        return text, None
+    people = graph.people_named(text)
+    if len(people) == 0:
+        suggestions = suggest_names(text)
+        if suggestions:
+            return None, (f"person not found: {text} "
+                          f"(did you mean: {'; '.join(suggestions)})")
+        return None, f"person not found: {text}"
+    if len(people) > 1:
+        ids = ", ".join(graph.person_ids[person] for person in people)
+        return None, f"ambiguous name: {text} (ids {ids})"
+    return graph.person_ids[people[0]], None
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False, progress=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If `bidirectional` is true, searches from both ends at once and
+    meets in the middle, which explores far fewer people on long paths.
+
+    If `progress` is given, it is called after each layer with the number
+    of people reached so far and the size of their component, which
+    bounds how many the search can ever reach.
+
     If no possible path, returns None.
     """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
     if source == target:
         return []
-    short_path = []
-    explored_set = set()
-    frontier = QueueFrontier()
-    frontier.add(Node(source, None, None))
-
-    explore = True
-    while explore:
-        if frontier.empty():
-            return None
-        node = frontier.remove()
-        explored_set.add(node.state)
 
-        for movie, actor in neighbors_for_person(node.state):
-            if not frontier.contains_state(actor) and actor not in explored_set:
-                child = Node(actor, node, movie)
-                if child.state == target:
-                    while child.parent is not None:
-                        short_path.insert(0, (child.action, child.state))
-                        child = child.parent
-                    return short_path
-                else:
-                    frontier.add(child)
+    # People in different components can be answered without a search
+    if not graph.connected(source, target):
+        return None
+    if bidirectional:
+        return bidirectional_path(source, target, progress)
+
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    # parent[p] is the person p was reached from, via movie via[p]
+    parent = array("i", [-1]) * graph.num_people()
+    via = array("i", [-1]) * graph.num_people()
+    parent[source] = source
+
+    # Every star of a movie is reached the first time the movie is
+    # expanded, so each movie only needs to be scanned once
+    movie_seen = bytearray(graph.num_movies())
+
+    # Expand the search one layer at a time
+    frontier = [source]
+    reached = 1
+    while frontier:
+        if progress is not None:
+            progress(reached, graph.component_size(source))
+        next_frontier = []
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if movie_seen[movie]:
+                    continue
+                movie_seen[movie] = 1
+                for star in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                    if parent[star] == -1:
+                        parent[star] = person
+                        via[star] = movie
+                        if star == target:
+                            return trace_path(parent, via, source, target)
+                        next_frontier.append(star)
+        frontier = next_frontier
+        reached += len(frontier)
+    return None
+
+
+def bidirectional_path(source, target, progress=None):
+    """
+    Breadth-first search grown from both source and target, always
+    expanding whichever frontier is smaller by one whole layer.
+    Takes and returns the same values as the body of shortest_path.
+    """
+    # Search state per side; parent/via only hold people reached so far
+    forward = ({source: -1}, {}, set(), [source])
+    backward = ({target: -1}, {}, set(), [target])
+
+    while forward[3] and backward[3]:
+        if progress is not None:
+            progress(len(forward[0]) + len(backward[0]),
+                     graph.component_size(source))
+        if len(forward[3]) <= len(backward[3]):
+            side, other = forward, backward
+        else:
+            side, other = backward, forward
+        meet = expand_layer(side, other[0])
+        if meet is not None:
+            # Source half, then the target half walked towards the target
+            path = trace_path(forward[0], forward[1], source, meet)
+            person = meet
+            parent, via = backward[0], backward[1]
+            while person != target:
+                path.append((graph.movie_ids[via[person]],
+                             graph.person_ids[parent[person]]))
+                person = parent[person]
+            return path
+    return None
+
+
+def expand_layer(side, other_parent):
+    """
+    Replaces a search side's frontier with the next layer of people.
+    Returns the first person already reached by the other side, if any.
+
+    The first meeting found is always on a shortest path: the two
+    visited sets were disjoint before this layer, so the other side's
+    copy of the meeting person must lie on its outermost layer.
+    """
+    parent, via, movie_seen, frontier = side
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    next_frontier = []
+    for person in frontier:
+        for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+            if movie in movie_seen:
+                continue
+            movie_seen.add(movie)
+            for star in movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                if star not in parent:
+                    parent[star] = person
+                    via[star] = movie
+                    if star in other_parent:
+                        return star
+                    next_frontier.append(star)
+    frontier[:] = next_frontier
+    return None
+
+
+def all_shortest_paths(source, target):
+    """
+    Yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, one at a time.
+
+    Yields nothing if there is no possible path.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if source == target:
+        yield []
+        return
+    if not graph.connected(source, target):
+        return
+    predecessors = shortest_path_dag(source, target)
+
+    # Walk the DAG back from the target depth first, so only the path
+    # being built is held in memory however many paths there are. Each
+    # node's parent is the next person towards the target.
+    stack = [Node(target, None, None)]
+    while stack:
+        node = stack.pop()
+        if node.state == source:
+            path = []
+            while node.parent is not None:
+                path.append((graph.movie_ids[node.action],
+                             graph.person_ids[node.parent.state]))
+                node = node.parent
+            yield path
+            continue
+        links = predecessors[node.state]
+        for i in range(len(links) - 2, -1, -2):
+            stack.append(Node(links[i], node, links[i + 1]))
+
+
+def shortest_path_dag(source, target):
+    """
+    Breadth-first search from source that keeps, for every person up to
+    the target's layer, all the (person, movie) links reaching them from
+    the previous layer. Returns a dict of person to a flat list of
+    alternating predecessor and movie indices.
+    """
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_people = graph.movie_people
+
+    depth = {source: 0}
+    predecessors = {source: []}
+    movie_seen = set()
+    frontier = [source]
+    level = 0
+    while target not in depth:
+        next_frontier = []
+        for person in frontier:
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if movie in movie_seen:
+                    continue
+                movie_seen.add(movie)
+
+                # A movie first scanned from this layer only has stars on
+                # this layer or the next, so each star on this layer is
+                # a predecessor of each star on the next through it
+                stars = movie_people[movie_offsets[movie]:movie_offsets[movie + 1]]
+                sources = [star for star in stars if depth.get(star) == level]
+                for star in stars:
+                    if star not in depth:
+                        depth[star] = level + 1
+                        predecessors[star] = []
+                        next_frontier.append(star)
+                    if depth[star] == level + 1:
+                        links = predecessors[star]
+                        for previous in sources:
+                            links.append(previous)
+                            links.append(movie)
+        frontier = next_frontier
+        level += 1
+    return predecessors
+
+
+def top_shortest_paths(source, target, k, key=None):
+    """
+    Returns up to `k` shortest paths from source to target, ranked by
+    `key` (by default, paths through the most recent movies first).
+    Paths are streamed from all_shortest_paths so only `k` are kept.
+    """
+    if key is None:
+        key = recency
+    return heapq.nsmallest(k, all_shortest_paths(source, target), key=key)
+
+
+def recency(path):
+    """
+    Sort key ranking paths by their newest movie, then their next
+    newest, and so on.
+    """
+    years = []
+    for movie_id, _ in path:
+        year = graph.movie_years[graph.movie_index[movie_id]]
+        years.append(int(year) if year.isdigit() else 0)
+    return sorted((-year for year in years))
+
+
+def trace_path(parent, via, source, target):
+    """
+    Walks parent links back from target to source, returning the
+    (movie_id, person_id) pairs along the way in source-to-target order.
+    """
+    path = []
+    person = target
+    while person != source:
+        path.append((graph.movie_ids[via[person]], graph.person_ids[person]))
+        person = parent[person]
+    path.reverse()
+    return path
 
 
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
-    resolving ambiguities as needed.
+    resolving ambiguities and typos as needed.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = [graph.person_ids[person]
+                  for person in graph.people_named(name)]
     if len(person_ids) == 0:
+        suggestions = suggest_names(name)
+        if not suggestions:
+            return None
+        print(f"No one named '{name}'. Did you mean:")
+        for i, suggestion in enumerate(suggestions):
+            print(f"{i + 1}: {suggestion}")
+        try:
+            choice = int(input("Number (blank for none): "))
+            if 1 <= choice <= len(suggestions):
+                return person_id_for_name(suggestions[choice - 1])
+        except ValueError:
+            pass
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
-            name = person["name"]
-            birth = person["birth"]
+            person = graph.person_index[person_id]
+            name = graph.person_names[person]
+            birth = graph.person_births[person]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
         try:
             person_id = input("Intended Person ID: ")
@@ -143,16 +575,30 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def suggest_names(name, limit=5):
+    """
+    Returns names close to a misspelled or partial name: the nearest
+    fuzzy matches first, then completions of it as a prefix.
+    """
+    suggestions = fuzzy(graph, name, limit)
+    for completion in complete(graph, name, limit):
+        if len(suggestions) >= limit:
+            break
+        if completion not in suggestions:
+            suggestions.append(completion)
+    return suggestions
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in graph.movies_of(graph.person_index[person_id]):
+        movie_id = graph.movie_ids[movie]
+        for person in graph.stars_of(movie):
+            neighbors.add((movie_id, graph.person_ids[person]))
     return neighbors
 
 
@@ -0,0 +1,218 @@
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class Graph():
+    """
+    Co-star network with people and movies interned to dense integer ids.
+
+    Adjacency is held CSR-style in flat integer arrays: the movies of
+    person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are
+    `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+    """
+
+    def __init__(self):
+
+        # Interned ids: IMDb id <-> dense integer index
+        self.person_ids = []
+        self.person_index = {}
+        self.movie_ids = []
+        self.movie_index = {}
+
+        # Per-index attributes
+        self.person_names = []
+        self.person_births = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # Lower-cased names in sorted order and the person each belongs to,
+        # filled in by build()
+        self.name_keys = []
+        self.name_people = array("i")
+
+        # Trigram index over name_keys, filled in by
+        # nameindex.build_name_index()
+        self.trigram_keys = []
+        self.trigram_offsets = array("i", [0])
+        self.trigram_names = array("i")
+
+        # CSR adjacency, filled in by build()
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_people = array("i")
+
+        # Connected component label of each person and the size of each
+        # component, filled in by build()
+        self.person_component = array("i")
+        self.component_sizes = array("i")
+
+    def add_person(self, person_id, name, birth):
+        """
+        Interns a person and returns their integer index.
+        """
+        index = len(self.person_ids)
+        self.person_index[person_id] = index
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Interns a movie and returns its integer index.
+        """
+        index = len(self.movie_ids)
+        self.movie_index[movie_id] = index
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def build(self, star_people, star_movies):
+        """
+        Builds both CSR adjacency tables from parallel arrays of
+        (person index, movie index) star edges.
+        """
+        self.person_offsets, self.person_movies = csr(
+            len(self.person_ids), star_people, star_movies
+        )
+        self.movie_offsets, self.movie_people = csr(
+            len(self.movie_ids), star_movies, star_people
+        )
+
+        # Sort people by name so lookups can bisect instead of needing a dict
+        keys = [name.lower() for name in self.person_names]
+        order = sorted(range(len(keys)), key=keys.__getitem__)
+        self.name_keys = [keys[i] for i in order]
+        self.name_people = array("i", order)
+
+        self.person_component, self.component_sizes = components(
+            len(self.person_ids), self.movie_offsets, self.movie_people
+        )
+
+    def num_people(self):
+        return len(self.person_offsets) - 1
+
+    def num_movies(self):
+        return len(self.movie_offsets) - 1
+
+    def people_named(self, name):
+        """
+        Returns the indices of everyone with a name, ignoring case.
+        """
+        key = name.lower()
+        start = bisect_left(self.name_keys, key)
+        end = bisect_right(self.name_keys, key, start)
+        return self.name_people[start:end]
+
+    def connected(self, first, second):
+        """
+        Returns True if there is any path between two people.
+        """
+        return self.person_component[first] == self.person_component[second]
+
+    def component_size(self, person):
+        """
+        Returns the number of people reachable from a person, themselves
+        included.
+        """
+        return self.component_sizes[self.person_component[person]]
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person starred in.
+        """
+        return self.person_movies[
+            self.person_offsets[person]:self.person_offsets[person + 1]
+        ]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices who starred in a movie.
+        """
+        return self.movie_people[
+            self.movie_offsets[movie]:self.movie_offsets[movie + 1]
+        ]
+
+
+def csr(size, sources, targets):
+    """
+    Groups `targets` by `sources` with a counting sort.
+    Returns (offsets, indices) where the targets of source `s` are
+    `indices[offsets[s]:offsets[s + 1]]`. Duplicate edges are kept once.
+    """
+    # Count edges per source
+    counts = array("i", bytes(4 * (size + 1)))
+    for s in sources:
+        counts[s + 1] += 1
+
+    # Prefix sum into offsets
+    for i in range(size):
+        counts[i + 1] += counts[i]
+    offsets = counts
+
+    # Scatter targets into their source's slot
+    cursor = array("i", offsets[:-1])
+    indices = array("i", bytes(4 * len(targets)))
+    for s, t in zip(sources, targets):
+        indices[cursor[s]] = t
+        cursor[s] += 1
+
+    # Compact each slot in place, dropping duplicate edges
+    # (the same star row listed twice)
+    write = 0
+    start = 0
+    for s in range(size):
+        end = offsets[s + 1]
+        seen = set()
+        for i in range(start, end):
+            t = indices[i]
+            if t not in seen:
+                seen.add(t)
+                indices[write] = t
+                write += 1
+        start = end
+        offsets[s + 1] = write
+    del indices[write:]
+    return offsets, indices
+
+
+def components(size, movie_offsets, movie_people):
+    """
+    Labels people by connected component using union-find over each
+    movie's stars. Returns (labels, sizes) where `labels[p]` is a dense
+    component id and `sizes[c]` the number of people in component `c`.
+    """
+    parent = array("i", range(size))
+
+    def find(person):
+        # Path halving keeps the trees shallow without a rank array
+        while parent[person] != person:
+            parent[person] = parent[parent[person]]
+            person = parent[person]
+        return person
+
+    # Every star of a movie is in the same component as its first star
+    for movie in range(len(movie_offsets) - 1):
+        start, end = movie_offsets[movie], movie_offsets[movie + 1]
+        if end - start < 2:
+            continue
+        root = find(movie_people[start])
+        for star in movie_people[start + 1:end]:
+            star = find(star)
+            if star != root:
+                parent[star] = root
+
+    # Number components in order of their first person
+    labels = array("i", [-1]) * size
+    sizes = array("i")
+    for person in range(size):
+        root = find(person)
+        if labels[root] == -1:
+            labels[root] = len(sizes)
+            sizes.append(0)
+        labels[person] = labels[root]
+        sizes[labels[person]] += 1
+    return labels, sizes
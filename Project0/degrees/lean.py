@@ -0,0 +1,168 @@
+import csv
+import sys
+from array import array
+
+from graph import Graph
+
+
+class SideTable():
+    """
+    One column of a CSV file, left on disk and read back on demand.
+    Rows are found again by the byte offsets recorded while streaming
+    the file, so only an 8-byte offset per row is kept in memory.
+    """
+
+    def __init__(self, path, column, offsets):
+        self.path = path
+        self.column = column
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, index):
+        with open(self.path, "rb") as f:
+            f.seek(self.offsets[index])
+            reader = csv.reader(line.decode("utf-8") for line in f)
+            return next(reader)[self.column]
+
+
+def csv_rows(path):
+    """
+    Yields (byte offset, row) for each row of a CSV file after the
+    header, where the offset is where the row starts in the file.
+    """
+    with open(path, "rb") as f:
+        f.readline()
+        position = [f.tell()]
+
+        def lines():
+            for line in f:
+                position[0] += len(line)
+                yield line.decode("utf-8")
+
+        reader = csv.reader(lines())
+        while True:
+            start = position[0]
+            row = next(reader, None)
+            if row is None:
+                return
+            yield start, row
+
+
+def header(path):
+    with open(path, encoding="utf-8") as f:
+        return next(csv.reader(f))
+
+
+def load_lean(directory):
+    """
+    Streaming alternative to parsing every row into memory.
+
+    Reads stars.csv first and only keeps the people and movies it
+    references, so people without any movies cannot be looked up. Names
+    are kept for lookups, while births, titles and years stay on disk as
+    SideTables and are only read when a result is printed.
+    Returns the loaded Graph.
+    """
+    # Load stars, interning ids in order of first appearance
+    person_index = {}
+    movie_index = {}
+    star_people = array("i")
+    star_movies = array("i")
+    columns = header(f"{directory}/stars.csv")
+    person_column = columns.index("person_id")
+    movie_column = columns.index("movie_id")
+    for _, row in csv_rows(f"{directory}/stars.csv"):
+        person = person_index.setdefault(row[person_column], len(person_index))
+        movie = movie_index.setdefault(row[movie_column], len(movie_index))
+        star_people.append(person)
+        star_movies.append(movie)
+
+    # Load names and row offsets of referenced people
+    columns = header(f"{directory}/people.csv")
+    id_column = columns.index("id")
+    name_column = columns.index("name")
+    birth_column = columns.index("birth")
+    names = [None] * len(person_index)
+    person_offsets = array("q", [-1]) * len(person_index)
+    for offset, row in csv_rows(f"{directory}/people.csv"):
+        person = person_index.get(row[id_column])
+        if person is not None:
+            names[person] = row[name_column]
+            person_offsets[person] = offset
+
+    # Load row offsets of referenced movies
+    columns = header(f"{directory}/movies.csv")
+    movie_id_column = columns.index("id")
+    title_column = columns.index("title")
+    year_column = columns.index("year")
+    movie_offsets = array("q", [-1]) * len(movie_index)
+    for offset, row in csv_rows(f"{directory}/movies.csv"):
+        movie = movie_index.get(row[movie_id_column])
+        if movie is not None:
+            movie_offsets[movie] = offset
+
+    # Drop stars rows whose person or movie has no row of its own
+    person_remap = renumber(person_offsets)
+    movie_remap = renumber(movie_offsets)
+    kept_people = array("i")
+    kept_movies = array("i")
+    for person, movie in zip(star_people, star_movies):
+        if person_remap[person] != -1 and movie_remap[movie] != -1:
+            kept_people.append(person_remap[person])
+            kept_movies.append(movie_remap[movie])
+    del star_people, star_movies
+
+    graph = Graph()
+    graph.person_ids = [person_id for person_id, person in person_index.items()
+                        if person_remap[person] != -1]
+    graph.person_index = dict(zip(graph.person_ids, range(len(graph.person_ids))))
+    graph.person_names = [name for name in names if name is not None]
+    graph.person_births = SideTable(
+        f"{directory}/people.csv", birth_column,
+        array("q", (offset for offset in person_offsets if offset != -1))
+    )
+    graph.movie_ids = [movie_id for movie_id, movie in movie_index.items()
+                       if movie_remap[movie] != -1]
+    graph.movie_index = dict(zip(graph.movie_ids, range(len(graph.movie_ids))))
+    movie_offsets = array("q", (offset for offset in movie_offsets if offset != -1))
+    graph.movie_titles = SideTable(
+        f"{directory}/movies.csv", title_column, movie_offsets
+    )
+    graph.movie_years = SideTable(
+        f"{directory}/movies.csv", year_column, movie_offsets
+    )
+    graph.build(kept_people, kept_movies)
+    return graph
+
+
+def renumber(offsets):
+    """
+    Returns a map from old to new indices that skips entries never
+    found in their CSV file (offset -1), which map to -1.
+    """
+    remap = array("i", [-1]) * len(offsets)
+    count = 0
+    for index, offset in enumerate(offsets):
+        if offset != -1:
+            remap[index] = count
+            count += 1
+    return remap
+
+
+def peak_memory():
+    """
+    Returns the peak resident memory of this process in megabytes, or
+    None where the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
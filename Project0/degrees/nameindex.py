@@ -0,0 +1,171 @@
+from array import array
+from bisect import bisect_left
+
+from graph import csr
+
+
+def trigrams(key):
+    """
+    Returns the set of trigrams of a lower-cased name, padded with "$"
+    at both ends so that short names and word edges still match.
+    Changing one character of a name changes at most three of them.
+    """
+    padded = f"${key}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_name_index(graph):
+    """
+    Indexes every distinct name in `graph.name_keys` by trigram.
+
+    The index is stored CSR-style on the graph like the adjacency
+    tables: `trigram_keys` is the sorted list of trigrams and the
+    positions in `name_keys` of the names containing trigram `t` are
+    `trigram_names[trigram_offsets[t]:trigram_offsets[t + 1]]`.
+    """
+    keys = graph.name_keys
+    ids = {}
+    sources = array("i")
+    targets = array("i")
+    for position, key in enumerate(keys):
+
+        # Only index the first of several people sharing a name
+        if position and keys[position - 1] == key:
+            continue
+        for trigram in trigrams(key):
+            sources.append(ids.setdefault(trigram, len(ids)))
+            targets.append(position)
+
+    # Renumber trigrams in sorted order so lookups can bisect
+    graph.trigram_keys = sorted(ids)
+    rank = array("i", bytes(4 * len(ids)))
+    for i, trigram in enumerate(graph.trigram_keys):
+        rank[ids[trigram]] = i
+    sources = array("i", (rank[source] for source in sources))
+    graph.trigram_offsets, graph.trigram_names = csr(
+        len(ids), sources, targets
+    )
+
+
+def postings(graph, trigram):
+    """
+    Returns the positions of names containing a trigram.
+    """
+    i = bisect_left(graph.trigram_keys, trigram)
+    if i == len(graph.trigram_keys) or graph.trigram_keys[i] != trigram:
+        return graph.trigram_names[:0]
+    return graph.trigram_names[
+        graph.trigram_offsets[i]:graph.trigram_offsets[i + 1]
+    ]
+
+
+def complete(graph, prefix, limit=10):
+    """
+    Returns up to `limit` distinct names starting with `prefix`,
+    ignoring case, in alphabetical order.
+    """
+    prefix = prefix.lower()
+    keys = graph.name_keys
+    completions = []
+    position = bisect_left(keys, prefix)
+    while (position < len(keys) and keys[position].startswith(prefix)
+           and len(completions) < limit):
+        if not position or keys[position - 1] != keys[position]:
+            completions.append(display_name(graph, position))
+        position += 1
+    return completions
+
+
+def fuzzy(graph, name, limit=10, max_distance=2):
+    """
+    Returns up to `limit` distinct names close to `name`, ignoring case,
+    closest first. Names one edit away are looked for first, and the
+    search only widens (up to `max_distance` edits) if there are none.
+    """
+    key = name.lower()
+    grams = trigrams(key)
+    matches = []
+    for distance in range(1, max_distance + 1):
+        matches = fuzzy_matches(graph, key, grams, distance)
+        if matches:
+            break
+    matches.sort()
+    return [display_name(graph, position)
+            for _, _, _, position in matches[:limit]]
+
+
+def fuzzy_matches(graph, key, grams, distance):
+    """
+    Returns (edits, -shared trigrams, name, position) for every name
+    within `distance` edits of `key`.
+
+    A name within d edits still shares all but at most 3d of the query's
+    trigrams, so it must appear in at least one of the 3d + 1 rarest
+    trigram lists; only those are scanned for candidates. Queries too
+    short for that are compared with every name.
+    """
+    keys = graph.name_keys
+    required = len(grams) - 3 * distance
+    if required < 1:
+
+        # Fewer than 3d + 1 trigrams cannot rule anything out, so every
+        # distinct name is a candidate
+        candidates = [position for position in range(len(keys))
+                      if not position or keys[position - 1] != keys[position]]
+    else:
+        candidates = set()
+        lists = sorted((postings(graph, gram) for gram in grams), key=len)
+        for names in lists[:3 * distance + 1]:
+            candidates.update(names)
+
+    matches = []
+    for position in candidates:
+        candidate = keys[position]
+        if abs(len(candidate) - len(key)) > distance:
+            continue
+        shared = len(grams & trigrams(candidate))
+        if shared < required:
+            continue
+        edits = edit_distance(key, candidate, distance)
+        if edits <= distance:
+            matches.append((edits, -shared, candidate, position))
+    return matches
+
+
+def edit_distance(first, second, limit):
+    """
+    Returns the Levenshtein distance between two strings, or `limit + 1`
+    if it is greater than `limit`.
+
+    Only the diagonal band of cells within `limit` of the main diagonal
+    is computed, since every cell outside it already exceeds `limit`.
+    """
+    over = limit + 1
+    if abs(len(first) - len(second)) > limit:
+        return over
+    previous = [min(j, over) for j in range(len(second) + 1)]
+    for i, a in enumerate(first, 1):
+        current = [over] * (len(second) + 1)
+        if i <= limit:
+            current[0] = i
+        start = max(1, i - limit)
+        end = min(len(second), i + limit)
+        for j in range(start, end + 1):
+            cost = previous[j - 1] + (a != second[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = min(cost, over)
+        if min(current[start - 1:end + 1]) > limit:
+            return over
+        previous = current
+    return previous[-1]
+
+
+def display_name(graph, position):
+    """
+    Returns the name of the first person at a position in `name_keys`,
+    as it is spelled in the data.
+    """
+    return graph.person_names[graph.name_people[position]]
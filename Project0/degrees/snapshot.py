@@ -0,0 +1,110 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+from graph import Graph
+
+MAGIC = b"DEGREES3"
+
+# Integer arrays, stored as raw native int32 so they can be mapped in place
+ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_people",
+          "name_people", "person_component", "component_sizes",
+          "trigram_offsets", "trigram_names"]
+
+# String lists, stored as NUL-separated UTF-8
+STRINGS = ["person_ids", "person_names", "person_births", "name_keys",
+           "movie_ids", "movie_titles", "movie_years", "trigram_keys"]
+
+
+def source_stamps(directory, filenames):
+    """
+    Returns the size and modification time of each source file,
+    used to tell whether a snapshot is stale.
+    """
+    stamps = {}
+    for filename in filenames:
+        stat = os.stat(os.path.join(directory, filename))
+        stamps[filename] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def save_snapshot(graph, path, stamps):
+    """
+    Writes a graph to `path` as a header followed by 8-byte aligned
+    sections: the CSR arrays, then the string tables.
+    """
+    sections = [getattr(graph, name).tobytes() for name in ARRAYS]
+    sections += ["\0".join(getattr(graph, name)).encode("utf-8")
+                 for name in STRINGS]
+
+    # Lay out sections after the header, which is padded to 8 bytes
+    header = {
+        "byteorder": sys.byteorder,
+        "sources": stamps,
+        "sections": [],
+        "counts": [len(getattr(graph, name)) for name in STRINGS],
+    }
+    layout = []
+    offset = 0
+    for section in sections:
+        layout.append([offset, len(section)])
+        offset += len(section) + (-len(section) % 8)
+    header["sections"] = layout
+    encoded = json.dumps(header).encode("utf-8")
+    encoded += b" " * (-(len(MAGIC) + 4 + len(encoded)) % 8)
+    base = len(MAGIC) + 4 + len(encoded)
+
+    # Write to a temporary file first so a crash never leaves a torn snapshot
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(encoded)))
+        f.write(encoded)
+        for (start, size), section in zip(layout, sections):
+            f.seek(base + start)
+            f.write(section)
+        f.truncate(base + offset)
+    os.replace(temporary, path)
+
+
+def load_snapshot(path, stamps):
+    """
+    Maps a snapshot written by save_snapshot back into a Graph.
+    Returns None if the file is missing, unreadable, or was built from
+    source files that have since changed.
+    """
+    try:
+        f = open(path, "rb")
+    except OSError:
+        return None
+    with f:
+        if f.read(len(MAGIC)) != MAGIC:
+            return None
+        try:
+            (length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(length))
+        except (struct.error, ValueError):
+            return None
+        if header["byteorder"] != sys.byteorder or header["sources"] != stamps:
+            return None
+        base = len(MAGIC) + 4 + length
+
+        # The mapping stays alive for as long as the views into it do
+        data = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    graph = Graph()
+    sections = [data[base + start:base + start + size]
+                for start, size in header["sections"]]
+    for name, section in zip(ARRAYS, sections):
+        setattr(graph, name, section.cast("i"))
+    strings = zip(STRINGS, sections[len(ARRAYS):], header["counts"])
+    for name, section, count in strings:
+        text = str(section, "utf-8")
+        setattr(graph, name, text.split("\0") if count else [])
+
+    # Rebuild the id -> index lookups from the interned id lists
+    graph.person_index = dict(zip(graph.person_ids, range(len(graph.person_ids))))
+    graph.movie_index = dict(zip(graph.movie_ids, range(len(graph.movie_ids))))
+    return graph
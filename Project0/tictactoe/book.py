@@ -0,0 +1,58 @@
+import sys
+
+import tictactoe as ttt
+
+
+def positions():
+    """
+    Yields every 3x3 position reachable in play that is not yet over,
+    as (x, o) bitboards, once each.
+    """
+    engine = ttt.engine_for(ttt.initial_state())
+    seen = set()
+    stack = [(0, 0)]
+    while stack:
+        x, o = stack.pop()
+        if (x, o) in seen or engine.terminal(x, o):
+            continue
+        seen.add((x, o))
+        yield x, o
+        x_turn = ttt.count(x) == ttt.count(o)
+        for cell in range(9):
+            bit = 1 << cell
+            if not (x | o) & bit:
+                stack.append((x | bit, o) if x_turn else (x, o | bit))
+
+
+def build_book():
+    """
+    Returns {canonical key: best move} for every reachable position, up
+    to rotation and reflection, solved once each by the search engine.
+    """
+    engine = ttt.Engine(3, 3, 3)
+    book = {}
+    for x, o in positions():
+        key, _ = ttt.canonical(x, o)
+        if key not in book:
+            book[key] = engine.best_move(key & 0x1FF, key >> 9)
+    return book
+
+
+def write_book(book, filename):
+    with open(filename, "wb") as f:
+        f.write(ttt.BOOK_MAGIC)
+        for key in sorted(book):
+            f.write((key | book[key] << 18).to_bytes(3, "little"))
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [book.bin]")
+    filename = sys.argv[1] if len(sys.argv) == 2 else ttt.BOOK_FILE
+    book = build_book()
+    write_book(book, filename)
+    print(f"Wrote {len(book)} positions to {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,143 +2,444 @@
 Tic Tac Toe Player
 """
 
-import math
-import copy
+import os
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
 
-def initial_state():
+def initial_state(rows=3, cols=3):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    xCount = 0
-    oCount = 0
-    for i in board:  # row
-        for j in i:  # column
-            if j == X:
-                xCount += 1
-            elif j == O:
-                oCount += 1
-    if xCount == oCount:
-        return X
-    else:
-        return O
+    x, o = encode(board)
+    return X if count(x) == count(o) else O
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    posAct = set()
-    for i in range(0, len(board)):  # row
-        for j in range(0, len(board[i])):  # column
-            if board[i][j] == EMPTY:
-                posAct.add((i, j))
-    return posAct
+    return {(i, j) for i, row in enumerate(board)
+            for j, cell in enumerate(row) if cell == EMPTY}
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    boardCopy = copy.deepcopy(board)
+    boardCopy = [row[:] for row in board]
     boardCopy[action[0]][action[1]] = player(board)
     return boardCopy
 
 
-def winner(board):
+def winner(board, k=None):
     """
     Returns the winner of the game, if there is one.
     """
-    if all(i == board[0][0] for i in board[0]):
-        return board[0][0]
-    elif all(i == board[1][0] for i in board[1]):
-        return board[1][0]
-    elif all(i == board[2][0] for i in board[2]):
-        return board[2][0]
-    elif board[0][0] == board[1][0] and board[1][0] == board[2][0]:
-        return board[0][0]
-    elif board[0][1] == board[1][1] and board[1][1] == board[2][1]:
-        return board[0][1]
-    elif board[0][2] == board[1][2] and board[1][2] == board[2][2]:
-        return board[0][2]
-    elif board[0][0] == board[1][1] and board[1][1] == board[2][2]:
-        return board[0][0]
-    elif board[0][2] == board[1][1] and board[1][1] == board[2][0]:
-        return board[0][2]
+    engine = engine_for(board, k)
+    x, o = encode(board)
+    if engine.won(x):
+        return X
+    elif engine.won(o):
+        return O
     else:
         return None
 
-def terminal(board):
+def terminal(board, k=None):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None or (not any(EMPTY in sublist for sublist in board) and winner(board) is None):
-        return True
-    else:
-        return False
+    x, o = encode(board)
+    return engine_for(board, k).terminal(x, o)
 
-def utility(board):
+def utility(board, k=None):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    if winner(board) == X:
+    engine = engine_for(board, k)
+    x, o = encode(board)
+    if engine.won(x):
         return 1
-    elif winner(board) == O:
+    elif engine.won(o):
         return -1
     else:
         return 0
 
-def minimax(board):
+def minimax(board, k=None, time_limit=None):
     """
     Returns the optimal action for the current player on the board.
+
+    Boards may be any size, won by `k` in a row (by default, as many as
+    fit along the shorter side). Without a `time_limit` the game is
+    searched to the end; with one, in seconds, the best move found by
+    the deepest search that finished in time is returned.
     """
-    if terminal(board):
+    engine = engine_for(board, k)
+    x, o = encode(board)
+    if engine.terminal(x, o):
         return None
-    else:
-        if player(board) == X:
-            value, move = max_value(board)
-            return move
+
+    # The standard game is answered from the opening book when there is one
+    if (engine.rows, engine.cols, engine.k) == (3, 3, 3):
+        move = book_move(x, o)
+        if move is not None:
+            return divmod(move, 3)
+    return divmod(engine.best_move(x, o, time_limit), engine.cols)
+
+
+# Bitboard engine: each player's marks are one integer, with cell (i, j)
+# at bit i * cols + j
+
+# How far a stored value can be trusted: it is exact, or the true value
+# is at least (LOWER) or at most (UPPER) it
+EXACT, LOWER, UPPER = range(3)
+
+
+class Timeout(Exception):
+    pass
+
+
+class Engine():
+    """
+    Alpha-beta search for boards of `rows` x `cols` cells won by `k` in
+    a row.
+
+    Values are from X's point of view. A win is worth `self.win` less
+    the number of marks on the board when it happens, so quicker wins
+    score higher; positions cut off by the depth limit get a heuristic
+    score well inside that range.
+    """
+
+    def __init__(self, rows, cols, k):
+        if not 1 <= k <= max(rows, cols):
+            raise ValueError(f"cannot get {k} in a row on {rows}x{cols}")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+        self.masks = win_masks(rows, cols, k)
+        self.win = 10 ** (k + 3)
+
+        # Win lines through each cell, so a move only checks its own
+        self.lines = [[mask for mask in self.masks if mask >> cell & 1]
+                      for cell in range(self.cells)]
+
+        # Cells through which the most lines pass are tried first
+        self.order = sorted(range(self.cells),
+                            key=lambda cell: -len(self.lines[cell]))
+
+        # Heuristic worth of an open line holding some of one player's marks
+        self.weights = [0] + [10 ** (n - 1) for n in range(1, k + 1)]
+
+        # (value, move, bound, depth) of positions searched so far, keyed
+        # by both players' bits
+        self.table = {}
+
+        # Last move at each ply that caused a cutoff, tried early at that ply
+        self.killers = [None] * (self.cells + 1)
+
+        # Number of positions search() has visited, for benchmarking
+        self.nodes = 0
+        self.deadline = None
+
+    def won(self, bits):
+        """
+        Returns True if a player's bits cover a whole winning line.
+        """
+        for mask in self.masks:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def terminal(self, x, o):
+        return self.won(x) or self.won(o) or x | o == self.full
+
+    def best_move(self, x, o, time_limit=None):
+        """
+        Returns the bit index of the best move for the player to move.
+        With a time limit, searches one ply deeper at a time until the
+        result is certain or time runs out.
+        """
+        empty = self.cells - count(x | o)
+        if time_limit is None:
+            return self.search(x, o, empty, -2 * self.win, 2 * self.win)[1]
+
+        best = next(self.ordered_moves(x | o, None, None))
+        self.deadline = time.perf_counter() + time_limit
+        try:
+            for depth in range(1, empty + 1):
+                value, best = self.search(
+                    x, o, depth, -2 * self.win, 2 * self.win
+                )
+
+                # A forced win or loss will not change with more depth
+                if abs(value) > self.win - self.cells - 1:
+                    break
+        except Timeout:
+            pass
+        finally:
+            self.deadline = None
+        return best
+
+    def ordered_moves(self, occupied, hint, killer):
+        """
+        Yields the free cells, trying first the table's stored move and
+        then the killer move for this ply, then `self.order`.
+        """
+        tried = 0
+        for move in (hint, killer):
+            if move is not None and not (occupied | tried) >> move & 1:
+                tried |= 1 << move
+                yield move
+        for move in self.order:
+            if not (occupied | tried) >> move & 1:
+                yield move
+
+    def search(self, x, o, depth, alpha, beta):
+        """
+        Returns (value, move) for the player to move in a position
+        nobody has won yet, looking `depth` moves ahead.
+
+        Alpha-beta search: lines that cannot move the result out of
+        (alpha, beta) are cut off. Inside the window the value is exact;
+        otherwise it is only a bound, which the table remembers.
+        """
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes & 1023 \
+                and time.perf_counter() > self.deadline:
+            raise Timeout
+
+        occupied = x | o
+        if occupied == self.full:
+            return 0, None
+        if depth == 0:
+            return self.evaluate(x, o), None
+
+        key = x | o << self.cells
+        hint = None
+        entry = self.table.get(key)
+        if entry is not None:
+            value, move, bound, searched = entry
+            if searched >= depth and (
+                    bound == EXACT or (bound == LOWER and value >= beta)
+                    or (bound == UPPER and value <= alpha)):
+                return value, move
+            hint = move
+
+        # X maximises and O minimises; a move that completes a line wins
+        # on the spot, worth less the later it comes
+        maximising = count(x) == count(o)
+        ply = count(occupied)
+        win = self.win - (ply + 1)
+        window = (alpha, beta)
+        best, best_move = (-2 * self.win, None) if maximising \
+            else (2 * self.win, None)
+        for move in self.ordered_moves(occupied, hint, self.killers[ply]):
+            bit = 1 << move
+            if maximising:
+                child = x | bit
+                if self.completes(child, move):
+                    value = win
+                else:
+                    value, _ = self.search(child, o, depth - 1, alpha, beta)
+                if value > best:
+                    best, best_move = value, move
+                alpha = max(alpha, value)
+            else:
+                child = o | bit
+                if self.completes(child, move):
+                    value = -win
+                else:
+                    value, _ = self.search(x, child, depth - 1, alpha, beta)
+                if value < best:
+                    best, best_move = value, move
+                beta = min(beta, value)
+            if alpha >= beta:
+                self.killers[ply] = move
+                break
+
+        if best <= window[0]:
+            bound = UPPER
+        elif best >= window[1]:
+            bound = LOWER
         else:
-            value, move = min_value(board)
-            return move
-
-def max_value(board):
-    if terminal(board):
-        return utility(board), None  # no moves left
-    v = float('-inf')
-    act = None
-    for action in actions(board):
-        minVal, dud = min_value(result(board, action))
-        # regular max function only returns an Int, have to do own comparisons
-        if minVal > v:
-            v = minVal
-            act = action
-            if v == 1:
-                return v, act
-    return v, act
-
-def min_value(board):
-    if terminal(board):
-        return utility(board), None  # no moves left
-    v = float('inf')
-    act = None
-    for action in actions(board):
-        maxVal, dud = max_value(result(board, action))
-        # regular min function only returns an Int, have to do own comparisons
-        if maxVal < v:
-            v = maxVal
-            act = action
-            if v == -1:
-                return v, act
-    return v, act
+            bound = EXACT
+        self.table[key] = (best, best_move, bound, depth)
+        return best, best_move
+
+    def completes(self, bits, move):
+        """
+        Returns True if `move` completed a line for the player with `bits`.
+        """
+        for mask in self.lines[move]:
+            if bits & mask == mask:
+                return True
+        return False
+
+    def evaluate(self, x, o):
+        """
+        Scores a position cut off by the depth limit: every line still
+        open to only one player counts for them, more the fuller it is.
+        """
+        value = 0
+        for mask in self.masks:
+            xs = x & mask
+            os = o & mask
+            if xs and not os:
+                value += self.weights[count(xs)]
+            elif os and not xs:
+                value -= self.weights[count(os)]
+        return value
+
+
+def win_masks(rows, cols, k):
+    """
+    Returns the bit mask of every run of `k` cells in a row, column or
+    diagonal.
+    """
+    masks = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                if 0 <= end_i < rows and 0 <= end_j < cols:
+                    masks.append(sum(1 << ((i + di * n) * cols + j + dj * n)
+                                     for n in range(k)))
+    return masks
+
+
+# One engine per board shape and k, each with its own table
+engines = {}
+
+
+def engine_for(board, k=None):
+    """
+    Returns the engine for a board's shape and `k` in a row, by default
+    as many as fit along the shorter side.
+    """
+    rows, cols = len(board), len(board[0])
+    if k is None:
+        k = min(rows, cols)
+    key = (rows, cols, k)
+    if key not in engines:
+        engines[key] = Engine(rows, cols, k)
+    return engines[key]
+
+
+def reset():
+    """
+    Forgets everything the engines have learned, to time searches cold.
+    """
+    engines.clear()
+
+
+def encode(board):
+    """
+    Returns the bitboards (x, o) of a board.
+    """
+    x = o = 0
+    cols = len(board[0])
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (i * cols + j)
+            elif cell == O:
+                o |= 1 << (i * cols + j)
+    return x, o
+
+def count(bits):
+    return bin(bits).count("1")
+
+
+# Opening book for the 3x3 game, written by book.py: after an 8-byte
+# magic, one 3-byte little-endian entry per canonical position, holding
+# x | o << 9 in the low 18 bits and the best move's cell above them
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+BOOK_MAGIC = b"TTTBOOK1"
+
+# Book moves keyed by canonical position, loaded on first use;
+# empty if there is no book file
+book = None
+
+
+def symmetries(size):
+    """
+    Returns the 8 rotations and reflections of a square board, each as
+    a list giving the cell that every cell moves to.
+    """
+    perms = []
+    for turns in range(4):
+        for flip in (False, True):
+            perm = []
+            for cell in range(size * size):
+                i, j = divmod(cell, size)
+                if flip:
+                    j = size - 1 - j
+                for _ in range(turns):
+                    i, j = j, size - 1 - i
+                perm.append(i * size + j)
+            perms.append(perm)
+    return perms
+
+
+SYMMETRIES = symmetries(3)
+
+# SYMMETRY_BITS[s][bits] is a 9-bit board moved by symmetry s, so a
+# position is transformed with two lookups
+SYMMETRY_BITS = [[sum(1 << perm[cell] for cell in range(9) if bits >> cell & 1)
+                  for bits in range(1 << 9)]
+                 for perm in SYMMETRIES]
+
+
+def canonical(x, o):
+    """
+    Returns (key, symmetry) for a 3x3 position: the smallest x | o << 9
+    over its 8 symmetries, and the symmetry that gives it.
+    """
+    return min((table[x] | table[o] << 9, s)
+               for s, table in enumerate(SYMMETRY_BITS))
+
+
+def load_book(filename=BOOK_FILE):
+    """
+    Returns the opening book in a file as a dict from canonical key to
+    move, or an empty dict if the file is missing or not a book.
+    """
+    try:
+        with open(filename, "rb") as f:
+            data = f.read()
+    except OSError:
+        return {}
+    if not data.startswith(BOOK_MAGIC):
+        return {}
+    entries = {}
+    for start in range(len(BOOK_MAGIC), len(data) - 2, 3):
+        entry = int.from_bytes(data[start:start + 3], "little")
+        entries[entry & 0x3FFFF] = entry >> 18
+    return entries
+
+
+def book_move(x, o):
+    """
+    Returns the book move (a cell index) for a 3x3 position, or None if
+    the position is not in the book.
+    """
+    global book
+    if book is None:
+        book = load_book()
+    key, s = canonical(x, o)
+    move = book.get(key)
+    if move is None:
+        return None
+
+    # The book move is for the canonical board; map it back
+    return SYMMETRIES[s].index(move)
@@ -0,0 +1,141 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+# Who plays X and who plays O in each matchup
+MATCHUPS = {
+    "minimax-minimax": ("minimax", "minimax"),
+    "minimax-random": ("minimax", "random"),
+    "random-minimax": ("random", "minimax"),
+}
+
+
+def init_worker(rows, cols, k, time_limit, book):
+    """
+    Sets up a worker process with the board settings for every game.
+    """
+    global settings
+    settings = (rows, cols, k, time_limit)
+    if not book:
+        ttt.book = {}
+
+
+def play(matchup, seed):
+    """
+    Plays one game and returns (matchup, winner, minimax move latencies
+    in seconds).
+    """
+    rows, cols, k, time_limit = settings
+    rng = random.Random(seed)
+    board = ttt.initial_state(rows, cols)
+    latencies = []
+    while not ttt.terminal(board, k):
+        kind = MATCHUPS[matchup][0 if ttt.player(board) == ttt.X else 1]
+        if kind == "minimax":
+            start = time.perf_counter()
+            move = ttt.minimax(board, k, time_limit)
+            latencies.append(time.perf_counter() - start)
+        else:
+            move = rng.choice(sorted(ttt.actions(board)))
+        board = ttt.result(board, move)
+    return matchup, ttt.winner(board, k), latencies
+
+
+def play_batch(batch):
+    return [play(matchup, seed) for matchup, seed in batch]
+
+
+def game_value(rows, cols, k):
+    """
+    Returns 1 if X can force a win from the empty board, -1 if O can,
+    and 0 if perfect play is a draw, by searching the whole game.
+    """
+    board = ttt.initial_state(rows, cols)
+    engine = ttt.engine_for(board, k)
+    value, _ = engine.search(0, 0, engine.cells, -2 * engine.win, 2 * engine.win)
+    return (value > 0) - (value < 0)
+
+
+def percentile(values, fraction):
+    """
+    Returns the value below which `fraction` of sorted `values` fall.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Play AI-vs-AI and AI-vs-random tictactoe games headless."
+    )
+    parser.add_argument("--games", type=int, default=1000,
+                        help="games per matchup")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--rows", type=int, default=3)
+    parser.add_argument("--cols", type=int, default=3)
+    parser.add_argument("-k", type=int, default=None,
+                        help="marks in a row to win (default: shorter side)")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="seconds per minimax move on larger boards")
+    parser.add_argument("--no-book", action="store_true",
+                        help="search every move instead of using the book")
+    args = parser.parse_args()
+
+    games = [(matchup, args.seed + i)
+             for matchup in MATCHUPS for i in range(args.games)]
+    batches = [games[i:i + 50] for i in range(0, len(games), 50)]
+    initargs = (args.rows, args.cols, args.k, args.time_limit,
+                not args.no_book)
+
+    # Tally results per matchup
+    outcomes = {matchup: {ttt.X: 0, ttt.O: 0, None: 0} for matchup in MATCHUPS}
+    latencies = []
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers, init_worker, initargs) as pool:
+        for results in pool.imap_unordered(play_batch, batches):
+            for matchup, winner, moves in results:
+                outcomes[matchup][winner] += 1
+                latencies.extend(moves)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'matchup':<16}{'X wins':>8}{'O wins':>8}{'draws':>8}")
+    for matchup, counts in outcomes.items():
+        print(f"{matchup:<16}{counts[ttt.X]:>8}{counts[ttt.O]:>8}"
+              f"{counts[None]:>8}")
+
+    latencies.sort()
+    print(f"{len(games)} games in {elapsed:.2f}s "
+          f"({len(games) / elapsed:.0f} games/s, {args.workers} workers)")
+    print(f"Minimax move latency over {len(latencies)} moves (us): "
+          f"p50 {percentile(latencies, 0.5) * 1e6:.0f}, "
+          f"p90 {percentile(latencies, 0.9) * 1e6:.0f}, "
+          f"p99 {percentile(latencies, 0.99) * 1e6:.0f}, "
+          f"max {latencies[-1] * 1e6 if latencies else 0:.0f}")
+
+    # A searched-to-the-end player must never do worse than the game's
+    # value from its side: never lose a drawn game, always win a won one
+    if args.time_limit is not None:
+        print("Not checking results: moves were cut off by the time limit.")
+        return
+    value = game_value(args.rows, args.cols, args.k)
+    results = {ttt.X: 1, ttt.O: -1, None: 0}
+    failures = 0
+    for matchup, counts in outcomes.items():
+        for side, sign in zip(MATCHUPS[matchup], [1, -1]):
+            if side == "minimax":
+                failures += sum(n for winner, n in counts.items()
+                                if results[winner] * sign < value * sign)
+    if failures:
+        sys.exit(f"Minimax fell short of perfect play in {failures} games")
+    print("Minimax always reached the game's value with perfect play.")
+
+
+if __name__ == "__main__":
+    main()
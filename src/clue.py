@@ -22,9 +22,9 @@ symbols = characters + rooms + weapons
 
 def check_knowledge(knowledge):
     for symbol in symbols:
-        if model_check(knowledge, symbol):
+        if entails(knowledge, symbol):
             termcolor.cprint(f"{symbol}: YES", "green")
-        elif not model_check(knowledge, Not(symbol)):
+        elif not entails(knowledge, Not(symbol)):
             print(f"{symbol}: MAYBE")
 
 
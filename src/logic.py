@@ -1,5 +1,9 @@
 import itertools
 
+# Nesting depth at which Sentence.compile moves a subsentence into its
+# own variable, well inside the ~200 levels Python can parse
+COMPILE_DEPTH = 50
+
 
 class Sentence():
 
@@ -13,7 +17,76 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        symbols = set()
+        seen = set()
+        stack = [self]
+        while stack:
+            sentence = stack.pop()
+            if id(sentence) in seen:
+                continue
+            seen.add(id(sentence))
+            if isinstance(sentence, Symbol):
+                symbols.add(sentence.name)
+            stack.extend(sentence.parts())
+        return symbols
+
+    def parts(self):
+        """Returns the sentences this sentence is built from."""
+        return []
+
+    def code(self, values, positions):
+        """Returns a Python expression for the sentence over model bits m,
+        given the expressions for its parts."""
+        raise Exception("nothing to compile")
+
+    def compile(self, positions):
+        """Returns a function evaluating the sentence on a bit-packed model.
+
+        The model is an integer whose bit positions[name] holds the truth
+        value of each symbol. The sentence becomes one generated function
+        returning a single Python expression, so evaluating it makes one
+        call and keeps and/or short-circuiting. Python cannot parse
+        expressions nested more than about 200 levels, so any subsentence
+        COMPILE_DEPTH levels deep is first computed into its own variable,
+        as is any compound subsentence used in more than one place.
+        """
+        uses = {}
+        stack = [self]
+        while stack:
+            sentence = stack.pop()
+            uses[id(sentence)] = uses.get(id(sentence), 0) + 1
+            if uses[id(sentence)] == 1:
+                stack.extend(sentence.parts())
+
+        lines = []
+        compiled = {}
+        stack = [(self, False)]
+        while stack:
+            sentence, ready = stack.pop()
+            if id(sentence) in compiled:
+                continue
+            if not ready:
+                stack.append((sentence, True))
+                stack.extend((part, False) for part in sentence.parts())
+                continue
+            parts = [compiled[id(part)] for part in sentence.parts()]
+            expression = sentence.code([code for code, _ in parts], positions)
+            depth = 1 + max((depth for _, depth in parts), default=0)
+            if depth >= COMPILE_DEPTH or (uses[id(sentence)] > 1 and parts):
+                variable = f"v{len(lines)}"
+                lines.append(f"    {variable} = {expression}")
+                expression, depth = variable, 0
+            compiled[id(sentence)] = (expression, depth)
+        lines.append(f"    return {compiled[id(self)][0]}")
+        namespace = {}
+        exec("def evaluate(m):\n" + "\n".join(lines), namespace)
+        return namespace["evaluate"]
+
+    def to_cnf(self):
+        """Returns a CNF whose clauses are satisfiable exactly when the sentence is."""
+        cnf = CNF()
+        cnf.add(self)
+        return cnf
 
     @classmethod
     def validate(cls, sentence):
@@ -62,6 +135,9 @@ class Symbol(Sentence):
         except KeyError:
             raise EvaluationException(f"variable {self.name} not in model")
 
+    def code(self, values, positions):
+        return f"(m >> {positions[self.name]} & 1)"
+
     def formula(self):
         return self.name
 
@@ -86,12 +162,15 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def parts(self):
+        return [self.operand]
+
+    def code(self, values, positions):
+        return f"(not {values[0]})"
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
     def __init__(self, *conjuncts):
@@ -120,15 +199,20 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def parts(self):
+        return self.conjuncts
+
+    def code(self, values, positions):
+        if not values:
+            return "True"
+        return "(" + " and ".join(values) + ")"
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
     def __init__(self, *disjuncts):
@@ -151,15 +235,20 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def parts(self):
+        return self.disjuncts
+
+    def code(self, values, positions):
+        if not values:
+            return "False"
+        return "(" + " or ".join(values) + ")"
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
     def __init__(self, antecedent, consequent):
@@ -183,14 +272,17 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def parts(self):
+        return [self.antecedent, self.consequent]
+
+    def code(self, values, positions):
+        return f"(not {values[0]} or {values[1]})"
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
     def __init__(self, left, right):
@@ -216,48 +308,236 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def parts(self):
+        return [self.left, self.right]
+
+    def code(self, values, positions):
+        return f"((not {values[0]}) == (not {values[1]}))"
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Number each symbol's bit, so every model is an integer below 2^n
+    positions = {symbol: i for i, symbol in enumerate(symbols)}
+    knowledge_true = knowledge.compile(positions)
+    query_true = query.compile(positions)
+
+    # In every model where knowledge is true, query must also be true
+    for model in range(1 << len(symbols)):
+        if knowledge_true(model) and not query_true(model):
+            return False
+    return True
+
+
+def entails(knowledge, query):
+    """Checks if knowledge base entails query, using a SAT solver.
+
+    Gives the same answer as model_check: knowledge entails query exactly
+    when knowledge ∧ ¬query has no model, which DPLL decides from the
+    clause form without enumerating every model.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not dpll([frozenset(clause) for clause in cnf.clauses])
+
+
+class CNF():
+    """Clauses in conjunctive normal form over integer literals.
+
+    Symbols are numbered from 1 in the order they are met; a literal is a
+    symbol's number, or its negation for the negated symbol. Sentences are
+    added by Tseitin encoding: every compound subsentence gets a fresh
+    variable with a few clauses tying it to its parts, so the clauses grow
+    linearly with the sentence instead of exponentially. The clauses are
+    satisfiable exactly when the added sentences are.
+    """
+
+    def __init__(self):
+        self.clauses = []
+
+        # Symbol table: symbol name <-> variable number
+        self.numbers = {}
+        self.names = {}
+        self.variables = 0
+
+        # Literal already standing for each compound subsentence, keyed
+        # by its type and its parts' literals
+        self.definitions = {}
+
+    def variable(self, name=None):
+        """Returns the variable for a symbol name, or a fresh one."""
+        if name is not None and name in self.numbers:
+            return self.numbers[name]
+        self.variables += 1
+        if name is not None:
+            self.numbers[name] = self.variables
+            self.names[self.variables] = name
+        return self.variables
+
+    def add(self, sentence):
+        """Adds clauses asserting that a sentence is true."""
+        sentences = [sentence]
+        while sentences:
+            sentence = sentences.pop()
+            if isinstance(sentence, And):
+                sentences.extend(reversed(sentence.conjuncts))
+            elif isinstance(sentence, Or):
+                self.clauses.append([self.literal(disjunct)
+                                     for disjunct in sentence.disjuncts])
+            else:
+                self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal that is true exactly when a sentence is.
+
+        Parts are encoded before the sentences built from them, working
+        from an explicit stack so that deep sentences do not recurse.
+        """
+        literals = {}
+        stack = [(sentence, False)]
+        while stack:
+            current, ready = stack.pop()
+            if id(current) in literals:
+                continue
+            if not ready:
+                Sentence.validate(current)
+                stack.append((current, True))
+                stack.extend((part, False) for part in current.parts())
+                continue
+            parts = [literals[id(part)] for part in current.parts()]
+            literals[id(current)] = self.define(current, parts)
+        return literals[id(sentence)]
+
+    def define(self, sentence, parts):
+        """Returns a literal for a sentence, given its parts' literals."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        if isinstance(sentence, Not):
+            return -parts[0]
+        key = (type(sentence), tuple(parts))
+        if key in self.definitions:
+            return self.definitions[key]
+
+        # a <=> sentence, as clauses over the parts' literals
+        if isinstance(sentence, And):
+            a = self.variable()
+            self.clauses.extend([-a, part] for part in parts)
+            self.clauses.append([a] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            a = self.variable()
+            self.clauses.extend([a, -part] for part in parts)
+            self.clauses.append([-a] + parts)
+        elif isinstance(sentence, Implication):
+            antecedent, consequent = parts
+            a = self.variable()
+            self.clauses.append([-a, -antecedent, consequent])
+            self.clauses.append([a, antecedent])
+            self.clauses.append([a, -consequent])
+        elif isinstance(sentence, Biconditional):
+            left, right = parts
+            a = self.variable()
+            self.clauses.append([-a, -left, right])
+            self.clauses.append([-a, left, -right])
+            self.clauses.append([a, left, right])
+            self.clauses.append([a, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.definitions[key] = a
+        return a
+
+    def dimacs(self):
+        """Returns the clauses in DIMACS CNF format, naming symbols in comments."""
+        lines = [f"c {number} {name}" for number, name in self.names.items()]
+        lines.append(f"p cnf {self.variables} {len(self.clauses)}")
+        lines.extend(" ".join(str(literal) for literal in clause + [0])
+                     for clause in self.clauses)
+        return "\n".join(lines) + "\n"
+
+
+def assign(clauses, literal):
+    """Returns clauses simplified by making literal true,
+    or None if that leaves a clause that cannot be satisfied."""
+    simplified = []
+    for clause in clauses:
+        if literal in clause:
+            continue
+        if -literal in clause:
+            clause = clause - {-literal}
+            if not clause:
+                return None
+        simplified.append(clause)
+    return simplified
+
+
+def dpll(clauses):
+    """Returns True if the clauses can all be satisfied at once.
+
+    Davis-Putnam-Logemann-Loveland search: literals forced by unit clauses
+    and literals that only appear with one sign are assigned without
+    branching, and only then is a literal guessed both ways. Branches
+    waiting to be tried are kept on an explicit stack rather than in
+    recursive calls, so the search depth is not limited by Python's
+    recursion limit.
+    """
+    if not all(clauses):
+        return False
+    stack = [clauses]
+    while stack:
+        clauses = propagate(stack.pop())
+        if clauses is None:
+            continue
+        if not clauses:
+            return True
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+        # Branch on the most common literal among the shortest clauses,
+        # pushing its negation first so the literal itself is tried first
+        literal = branch_literal(clauses)
+        for choice in (-literal, literal):
+            branch = assign(clauses, choice)
+            if branch is not None:
+                stack.append(branch)
+    return False
+
+
+def propagate(clauses):
+    """Returns clauses after unit propagation and pure literal elimination,
+    or None if that leaves a clause that cannot be satisfied."""
+    while True:
+
+        # Unit propagation
+        unit = next((clause for clause in clauses if len(clause) == 1), None)
+        if unit is not None:
+            (literal,) = unit
+            clauses = assign(clauses, literal)
+            if clauses is None:
+                return None
+            continue
+
+        # Pure literal elimination
+        literals = set().union(*clauses)
+        pure = [literal for literal in literals if -literal not in literals]
+        if not pure:
+            return clauses
+        for literal in pure:
+            clauses = assign(clauses, literal)
+
+
+def branch_literal(clauses):
+    """Returns the most common literal among the shortest clauses."""
+    shortest = min(len(clause) for clause in clauses)
+    counts = {}
+    for clause in clauses:
+        if len(clause) == shortest:
+            for literal in clause:
+                counts[literal] = counts.get(literal, 0) + 1
+    return max(counts, key=counts.get)
@@ -52,5 +52,5 @@ knowledge.add(And(
 ))
 
 for symbol in symbols:
-    if model_check(knowledge, symbol):
+    if entails(knowledge, symbol):
         print(symbol)
@@ -0,0 +1,107 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+from generate import GENERATORS, generate, write_maze
+from maze import STRATEGIES, Maze, NoSolution
+
+FIELDS = ["kind", "height", "width", "seed", "strategy", "load_seconds",
+          "solve_seconds", "explored", "length"]
+
+
+def measure(filename, strategy, repeat):
+    """
+    Loads and solves a maze file `repeat` times and returns a result row
+    with the fastest load and solve times. A maze without a solution
+    gets a length of None.
+    """
+    load_seconds = solve_seconds = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        maze = Maze(filename)
+        load_seconds = min(load_seconds, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        try:
+            maze.solve(strategy)
+            length = len(maze.solution[0])
+        except NoSolution:
+            length = None
+        solve_seconds = min(solve_seconds, time.perf_counter() - start)
+    return {
+        "strategy": strategy,
+        "load_seconds": round(load_seconds, 6),
+        "solve_seconds": round(solve_seconds, 6),
+        "explored": maze.num_explored,
+        "length": length,
+    }
+
+
+def run(kinds, sizes, seeds, strategies, repeat=1):
+    """
+    Generates every kind of maze at every size and seed and measures
+    each strategy on it. Yields one result row per solve.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "maze.txt")
+        for kind in kinds:
+            for height, width in sizes:
+                for seed in seeds:
+                    write_maze(generate(kind, height, width, seed), filename)
+                    for strategy in strategies:
+                        row = {"kind": kind, "height": height,
+                               "width": width, "seed": seed}
+                        row.update(measure(filename, strategy, repeat))
+                        yield row
+
+
+def size(text):
+    """
+    Parses a size given as HEIGHTxWIDTH, or one number for a square.
+    """
+    height, _, width = text.lower().partition("x")
+    return int(height), int(width or height)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time Maze loading and solving on generated mazes."
+    )
+    parser.add_argument("--kinds", nargs="+", choices=list(GENERATORS),
+                        default=list(GENERATORS))
+    parser.add_argument("--sizes", nargs="+", type=size,
+                        default=[(51, 51), (201, 201)], metavar="HxW")
+    parser.add_argument("--seeds", nargs="+", type=int, default=[0, 1, 2])
+    parser.add_argument("--strategies", nargs="+", choices=STRATEGIES,
+                        default=STRATEGIES)
+    parser.add_argument("--repeat", type=int, default=1,
+                        help="solve each maze this many times, keep the fastest")
+    parser.add_argument("--format", choices=["csv", "json"], default="csv")
+    parser.add_argument("--output", default=None,
+                        help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    rows = run(args.kinds, args.sizes, args.seeds, args.strategies,
+               args.repeat)
+    f = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                f.flush()
+        else:
+            json.dump(list(rows), f, indent=2)
+            f.write("\n")
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import random
+
+
+def backtracker(height, width, rng):
+    """
+    Returns the rows of a perfect maze carved by a randomised depth-first
+    search (recursive backtracker): long winding corridors, one path
+    between any two cells.
+    """
+    grid = walled(height, width)
+    cells = passages(height, width)
+    inside = set(cells)
+    start = cells[0]
+    grid[start[0]][start[1]] = " "
+    visited = {start}
+    stack = [start]
+    while stack:
+        row, col = stack[-1]
+        options = [(r, c) for r, c in around(row, col, 2)
+                   if (r, c) in inside and (r, c) not in visited]
+        if not options:
+            stack.pop()
+            continue
+        r, c = rng.choice(options)
+        grid[(row + r) // 2][(col + c) // 2] = " "
+        grid[r][c] = " "
+        visited.add((r, c))
+        stack.append((r, c))
+    return finish(grid, cells[0], cells[-1])
+
+
+def prim(height, width, rng):
+    """
+    Returns the rows of a perfect maze grown by randomised Prim's
+    algorithm: many short dead ends branching off every passage.
+    """
+    grid = walled(height, width)
+    cells = passages(height, width)
+    inside = set(cells)
+    start = cells[0]
+    grid[start[0]][start[1]] = " "
+    visited = {start}
+
+    # Walls between a visited cell and an unvisited one, as (cell, next)
+    edges = [(start, cell) for cell in around(*start, 2) if cell in inside]
+    while edges:
+        (row, col), (r, c) = edges.pop(rng.randrange(len(edges)))
+        if (r, c) in visited:
+            continue
+        grid[(row + r) // 2][(col + c) // 2] = " "
+        grid[r][c] = " "
+        visited.add((r, c))
+        edges.extend(((r, c), cell) for cell in around(r, c, 2)
+                     if cell in inside and cell not in visited)
+    return finish(grid, cells[0], cells[-1])
+
+
+def rooms(height, width, rng, room=8):
+    """
+    Returns the rows of a grid of open rooms about `room` cells across,
+    with one doorway in each wall between neighbouring rooms.
+    """
+    grid = [[" "] * width for _ in range(height)]
+
+    # Walls stop short of the last row and column, which the goal is on
+    for row in range(room, height - 1, room + 1):
+        grid[row] = ["#"] * width
+    for col in range(room, width - 1, room + 1):
+        for row in range(height):
+            grid[row][col] = "#"
+
+    # A door in each horizontal wall segment, then each vertical one
+    for row in range(room, height - 1, room + 1):
+        for left in range(0, width, room + 1):
+            right = min(left + room, width)
+            grid[row][rng.randrange(left, right)] = " "
+    for col in range(room, width - 1, room + 1):
+        for top in range(0, height, room + 1):
+            bottom = min(top + room, height)
+            grid[rng.randrange(top, bottom)][col] = " "
+    return finish(grid, (0, 0), (height - 1, width - 1))
+
+
+def pillars(height, width, rng):
+    """
+    Returns the rows of one big room with scattered rectangular pillars.
+    """
+    grid = [[" "] * width for _ in range(height)]
+    for _ in range(max(height, width) // 4):
+        h = rng.randint(1, height // 8 + 1)
+        w = rng.randint(1, width // 8 + 1)
+        top, left = rng.randrange(height - h + 1), rng.randrange(width - w + 1)
+        for row in range(top, top + h):
+            for col in range(left, left + w):
+                grid[row][col] = "#"
+    return finish(grid, (0, 0), (height - 1, width - 1))
+
+
+def corridors(height, width, rng):
+    """
+    Returns the rows of a grid of long horizontal walls, each broken by
+    a few gaps.
+    """
+    grid = [[" "] * width for _ in range(height)]
+    for row in range(2, height - 1, 3):
+        grid[row] = ["#"] * width
+        for _ in range(3):
+            grid[row][rng.randrange(width)] = " "
+    return finish(grid, (0, 0), (height - 1, width - 1))
+
+
+GENERATORS = {
+    "backtracker": backtracker,
+    "prim": prim,
+    "rooms": rooms,
+    "pillars": pillars,
+    "corridors": corridors,
+}
+
+
+def walled(height, width):
+    return [["#"] * width for _ in range(height)]
+
+
+def passages(height, width):
+    """
+    Returns the cells a perfect maze is carved through: every cell with
+    odd row and column, leaving walls between them.
+    """
+    cells = [(row, col) for row in range(1, height - 1, 2)
+             for col in range(1, width - 1, 2)]
+    if len(cells) < 2:
+        raise ValueError("maze too small to carve")
+    return cells
+
+
+def around(row, col, step):
+    return [(row - step, col), (row + step, col),
+            (row, col - step), (row, col + step)]
+
+
+def finish(grid, start, goal):
+    """
+    Marks the start and goal and returns the grid as strings.
+    """
+    grid[start[0]][start[1]] = "A"
+    grid[goal[0]][goal[1]] = "B"
+    return ["".join(row) for row in grid]
+
+
+def generate(kind, height, width, seed=None):
+    """
+    Returns the rows of a maze of the given kind, one of GENERATORS.
+    The same seed always gives the same maze.
+    """
+    if kind not in GENERATORS:
+        raise ValueError(f"unknown maze kind: {kind}")
+    return GENERATORS[kind](height, width, random.Random(seed))
+
+
+def write_maze(rows, filename):
+    with open(filename, "w") as f:
+        f.write("\n".join(rows) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a maze in the A/B/#/space text format."
+    )
+    parser.add_argument("kind", choices=list(GENERATORS))
+    parser.add_argument("height", type=int)
+    parser.add_argument("width", type=int)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="maze.txt")
+    args = parser.parse_args()
+    write_maze(generate(args.kind, args.height, args.width, args.seed),
+               args.output)
+
+
+if __name__ == "__main__":
+    main()
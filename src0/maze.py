@@ -1,45 +1,68 @@
+import heapq
 import sys
 
-class Node():
-    def __init__(self, state, parent, action):
-        self.state = state
-        self.parent = parent
-        self.action = action
+import numpy as np
 
+from search import (BucketFrontier, Node, PriorityFrontier, Problem,
+                    QueueFrontier, StackFrontier, Stats, search, solution)
 
-class StackFrontier():
-    def __init__(self):
-        self.frontier = []
 
-    def add(self, node):
-        self.frontier.append(node)
+class NoSolution(Exception):
+    """
+    Raised when the goal cannot be reached from the start.
+    """
 
-    def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
 
-    def empty(self):
-        return len(self.frontier) == 0
+class CellSet():
+    """
+    Read-only set of (row, col) cells backed by a boolean grid, so large
+    explored regions need not be built up as a set of tuples.
+    """
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
-            return node
+    def __init__(self, mask):
+        self.mask = mask
 
+    def __contains__(self, cell):
+        row, col = cell
+        height, width = self.mask.shape
+        return 0 <= row < height and 0 <= col < width and bool(self.mask[row, col])
 
-class QueueFrontier(StackFrontier):
+    def __len__(self):
+        return int(np.count_nonzero(self.mask))
 
-    def remove(self):
-        if self.empty():
-            raise Exception("empty frontier")
-        else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
-            return node
+    def __iter__(self):
+        rows, cols = np.nonzero(self.mask)
+        return zip(rows.tolist(), cols.tolist())
+
+
+# What to draw in a cell, and the colour it is drawn in
+EMPTY, WALL, START, GOAL, SOLUTION, EXPLORED = range(6)
+COLORS = np.array([
+    (237, 240, 252, 255),
+    (40, 40, 40, 255),
+    (255, 0, 0, 255),
+    (0, 171, 28, 255),
+    (220, 235, 113, 255),
+    (212, 97, 85, 255),
+], dtype=np.uint8)
+
+# Row and column offset of each action
+DIRECTIONS = {
+    "up": (-1, 0),
+    "down": (1, 0),
+    "left": (0, -1),
+    "right": (0, 1),
+}
 
-class Maze():
+# Action taking a step of each offset
+ACTIONS = {offset: action for action, offset in DIRECTIONS.items()}
+
+INFINITY = float("inf")
+
+STRATEGIES = ["dfs", "bfs", "ucs", "greedy", "astar", "layers", "jps"]
+
+
+class Maze(Problem):
 
     def __init__(self, filename):
 
@@ -58,48 +81,71 @@ class Maze():
         self.height = len(contents)
         self.width = max(len(line) for line in contents)
 
-        # Keep track of walls
-        self.walls = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                try:
-                    if contents[i][j] == "A":
-                        self.start = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == "B":
-                        self.goal = (i, j)
-                        row.append(False)
-                    elif contents[i][j] == " ":
-                        row.append(False)
-                    else:
-                        row.append(True)
-                except IndexError:
-                    row.append(False)
-            self.walls.append(row)
+        # Lay the maze out as one byte per cell, padding short lines with
+        # open space, so cells can be classified with array operations
+        cells = "".join(line.ljust(self.width) for line in contents)
+        grid = np.frombuffer(cells.encode("ascii", "replace"), dtype=np.uint8)
+
+        # Keep track of walls: anything but the start, goal or a space
+        self.walls = ~np.isin(grid, np.frombuffer(b"AB ", dtype=np.uint8))
+        self.walls = self.walls.reshape(self.height, self.width)
+        self.start = divmod(int(np.flatnonzero(grid == ord("A"))[0]), self.width)
+        self.goal = divmod(int(np.flatnonzero(grid == ord("B"))[0]), self.width)
+
+        # One byte per cell, indexed by flat cell id (row * width + col),
+        # for fast lookups from the one-node-at-a-time solvers
+        self.wall_bytes = bytearray(self.walls.tobytes())
 
         self.solution = None
 
+        # Incremental planner used by replan(), and cells whose walls
+        # changed since it last ran
+        self.planner = None
+        self.changed = []
+
 
     def print(self):
-        solution = self.solution[1] if self.solution is not None else None
+        codes = self.cell_codes(show_solution=True, show_explored=False)
+        symbols = np.array([" ", "█", "A", "B", "*", " "])
+        lines = ["".join(row) for row in symbols[codes].tolist()]
         print()
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-                if col:
-                    print("█", end="")
-                elif (i, j) == self.start:
-                    print("A", end="")
-                elif (i, j) == self.goal:
-                    print("B", end="")
-                elif solution is not None and (i, j) in solution:
-                    print("*", end="")
-                else:
-                    print(" ", end="")
-            print()
+        print("\n".join(lines))
         print()
 
 
+    def cell_codes(self, show_solution, show_explored):
+        """
+        Returns a height x width array saying what to draw in each cell:
+        one of EMPTY, WALL, START, GOAL, SOLUTION or EXPLORED. Walls, then
+        the start and goal, win over the solution, which wins over
+        explored cells. Neither is shown until the maze is solved.
+        """
+        codes = np.full((self.height, self.width), EMPTY, dtype=np.uint8)
+        if self.solution is not None:
+            if show_explored:
+                codes[self.explored_mask()] = EXPLORED
+            if show_solution and self.solution[1]:
+                rows, cols = zip(*self.solution[1])
+                codes[list(rows), list(cols)] = SOLUTION
+        codes[self.start] = START
+        codes[self.goal] = GOAL
+        codes[self.walls] = WALL
+        return codes
+
+
+    def explored_mask(self):
+        """
+        Returns the explored cells as a boolean grid.
+        """
+        if isinstance(self.explored, CellSet):
+            return self.explored.mask
+        mask = np.zeros((self.height, self.width), dtype=bool)
+        if self.explored:
+            rows, cols = zip(*self.explored)
+            mask[list(rows), list(cols)] = True
+        return mask
+
+
     def neighbors(self, state):
         row, col = state
         candidates = [
@@ -111,119 +157,444 @@ class Maze():
 
         result = []
         for action, (r, c) in candidates:
-            if 0 <= r < self.height and 0 <= c < self.width and not self.walls[r][c]:
+            if 0 <= r < self.height and 0 <= c < self.width and not self.wall_bytes[r * self.width + c]:
                 result.append((action, (r, c)))
         return result
 
 
-    def solve(self):
-        """Finds a solution to maze, if one exists."""
+    def distance(self, state):
+        """Manhattan distance from a state to the goal."""
+        return abs(state[0] - self.goal[0]) + abs(state[1] - self.goal[1])
+
+
+    def solve(self, strategy="dfs"):
+        """
+        Finds a solution to maze, if one exists, using one of
+        STRATEGIES: depth-first ("dfs"), breadth-first ("bfs"),
+        uniform cost ("ucs"), greedy best-first ("greedy"), A* ("astar")
+        or breadth-first a whole layer at a time ("layers"), or A* over
+        jump points ("jps").
+        """
+        if strategy not in STRATEGIES:
+            raise ValueError(f"unknown strategy: {strategy}")
+        if strategy == "layers":
+            return self.solve_layers()
+        if strategy == "jps":
+            return self.solve_jps()
+
+        self.stats = Stats()
+        node = search(self, self.frontier(strategy), self.stats)
+        self.num_explored = self.stats.expanded
+        self.explored = self.stats.explored
+        if node is None:
+            raise NoSolution("no solution")
+        self.solution = solution(node)
+
+
+    def is_goal(self, state):
+        return state == self.goal
+
+
+    def heuristic(self, state):
+        return self.distance(state)
+
+
+    def solve_layers(self):
+        """
+        Breadth-first search that expands the whole frontier at once
+        with array operations over flat cell ids (row * width + col).
+        Finds the same shortest path length as "bfs".
+        """
+        width = self.width
+        size = self.height * width
+        start = self.start[0] * width + self.start[1]
+        goal = self.goal[0] * width + self.goal[1]
+        open_cells = ~self.walls.ravel()
+
+        # parent[c] is the cell c was first reached from
+        parent = np.full(size, -1, dtype=np.int64)
+        visited = np.zeros(size, dtype=bool)
+        expanded = np.zeros(size, dtype=bool)
+        visited[start] = True
+        frontier = np.array([start], dtype=np.int64)
 
-        # Keep track of number of states explored
         self.num_explored = 0
-
-        # Initialize frontier to just the starting position
-        start = Node(state=self.start, parent=None, action=None)
-        frontier = StackFrontier()
-        frontier.add(start)
-
-        # Initialize an empty explored set
+        while not visited[goal]:
+            if len(frontier) == 0:
+                raise NoSolution("no solution")
+            expanded[frontier] = True
+            self.num_explored += len(frontier)
+
+            # Step every frontier cell in each direction that stays in bounds
+            column = frontier % width
+            moves = [
+                (frontier - width, frontier >= width),
+                (frontier + width, frontier < size - width),
+                (frontier - 1, column > 0),
+                (frontier + 1, column < width - 1),
+            ]
+            cells = np.concatenate([cell[inside] for cell, inside in moves])
+            parents = np.concatenate([frontier[inside] for _, inside in moves])
+
+            # Keep the first way into each open, unvisited cell
+            keep = open_cells[cells] & ~visited[cells]
+            cells, first = np.unique(cells[keep], return_index=True)
+            parent[cells] = parents[keep][first]
+            visited[cells] = True
+            frontier = cells
+
+        # Count the goal itself, as the other strategies do
+        self.num_explored += 1
+        expanded[goal] = True
+
+        # Walk parents back from the goal, naming each step by its offset
+        actions = []
+        cells = []
+        cell = goal
+        while cell != start:
+            previous = int(parent[cell])
+            step = cell - previous
+            if step == -width:
+                actions.append("up")
+            elif step == width:
+                actions.append("down")
+            elif step == -1:
+                actions.append("left")
+            else:
+                actions.append("right")
+            cells.append(divmod(cell, width))
+            cell = previous
+        actions.reverse()
+        cells.reverse()
+        self.solution = (actions, cells)
+
+        self.explored = CellSet(expanded.reshape(self.height, width))
+
+
+    def solve_jps(self):
+        """
+        Jump Point Search: A* that only puts jump points on the frontier.
+
+        Of the many equally short paths through open space, only the one
+        that moves vertically first and turns horizontal is followed, so
+        straight runs are scanned cell by cell without touching the
+        frontier. A scan stops at the goal, or at a cell where a wall
+        forces the path to turn. Finds the same path length as "astar",
+        and num_explored counts jump points expanded.
+        """
+        self.num_explored = 0
+        frontier = self.frontier("astar")
+        frontier.add(Node(state=self.start, parent=None, action=None))
         self.explored = set()
+        best = {self.start: 0}
 
-        # Keep looping until solution found
         while True:
-
-            # If nothing left in frontier, then no path
             if frontier.empty():
-                raise Exception("no solution")
-
-            # Choose a node from the frontier
+                raise NoSolution("no solution")
             node = frontier.remove()
+            if node.state in self.explored:
+                continue
             self.num_explored += 1
 
-            # If node is the goal, then we have a solution
+            # Fill in the cells skipped between consecutive jump points
             if node.state == self.goal:
                 actions = []
                 cells = []
                 while node.parent is not None:
-                    actions.append(node.action)
-                    cells.append(node.state)
+                    (row, col), (dr, dc) = node.state, DIRECTIONS[node.action]
+                    while (row, col) != node.parent.state:
+                        actions.append(node.action)
+                        cells.append((row, col))
+                        row, col = row - dr, col - dc
                     node = node.parent
                 actions.reverse()
                 cells.reverse()
                 self.solution = (actions, cells)
                 return
 
-            # Mark node as explored
             self.explored.add(node.state)
 
-            # Add neighbors to frontier
-            for action, state in self.neighbors(node.state):
-                if not frontier.contains_state(state) and state not in self.explored:
-                    child = Node(state=state, parent=node, action=action)
-                    frontier.add(child)
+            for action in self.jump_directions(node):
+                state = self.jump(node.state, action)
+                if state is None or state in self.explored:
+                    continue
+                cost = node.cost + abs(state[0] - node.state[0]) \
+                    + abs(state[1] - node.state[1])
+                if cost < best.get(state, cost + 1):
+                    best[state] = cost
+                    frontier.add(Node(state, node, action, cost))
+
+
+    def jump_directions(self, node):
+        """
+        Returns the directions worth scanning from a jump point, given
+        the direction it was reached in.
+        """
+        if node.action is None:
+            return list(DIRECTIONS)
+
+        # Moving vertically, turning either way is still the preferred path
+        if node.action in ("up", "down"):
+            return [node.action, "left", "right"]
+
+        # Moving horizontally, only turn where a wall behind forced it
+        row, col = node.state
+        back = col - DIRECTIONS[node.action][1]
+        directions = [node.action]
+        for action, r in [("up", row - 1), ("down", row + 1)]:
+            if self.forced(r, col, back):
+                directions.append(action)
+        return directions
+
+
+    def forced(self, row, col, back):
+        """
+        Returns True if (row, col) is open but (row, back) beside it is a
+        wall, so the only shortest way in turns from the horizontal.
+        """
+        if not 0 <= row < self.height:
+            return False
+        walls = self.wall_bytes
+        return walls[row * self.width + back] and not walls[row * self.width + col]
+
+
+    def jump(self, state, action):
+        """
+        Scans from a state in a direction and returns the first jump
+        point reached, or None on hitting a wall or the edge.
+        """
+        row, col = state
+        dr, dc = DIRECTIONS[action]
+        width = self.width
+        walls = self.wall_bytes
+        while True:
+            row += dr
+            col += dc
+            if not (0 <= row < self.height and 0 <= col < width) \
+                    or walls[row * width + col]:
+                return None
+            if (row, col) == self.goal:
+                return (row, col)
+
+            # Horizontal: stop where a wall behind forces a turn
+            if dr == 0:
+                if self.forced(row - 1, col, col - dc) \
+                        or self.forced(row + 1, col, col - dc):
+                    return (row, col)
+
+            # Vertical: stop wherever a horizontal scan would find one
+            elif self.jump((row, col), "left") is not None \
+                    or self.jump((row, col), "right") is not None:
+                return (row, col)
+
+
+    def set_wall(self, cell, wall=True):
+        """
+        Adds (or with wall=False, removes) the wall at a cell.
+        Call replan() afterwards to update the solution.
+        """
+        row, col = cell
+        if not (0 <= row < self.height and 0 <= col < self.width):
+            raise ValueError(f"cell outside maze: {cell}")
+        if cell in (self.start, self.goal):
+            raise ValueError("cannot wall over the start or goal")
+        if self.walls[row, col] == wall:
+            return
+        self.walls[row, col] = wall
+        self.wall_bytes[row * self.width + col] = wall
+        self.changed.append(cell)
+
+
+    def replan(self):
+        """
+        Finds a shortest solution like solve("astar"), but reuses the
+        previous search: after set_wall() only the states whose
+        distance from the start changed are searched again.
+        """
+        if self.planner is None:
+            self.planner = LifelongPlanner(self)
+        else:
+            self.planner.update(self.changed)
+        self.changed = []
+        self.planner.compute()
+        self.num_explored = self.planner.num_explored
+        self.explored = self.planner.explored
+        self.solution = self.planner.path()
+
+
+    def frontier(self, strategy):
+        """
+        Returns an empty frontier that removes nodes in the order of a
+        strategy. A* breaks ties between equal estimates in favour of
+        the deeper node, which is nearer the goal.
+        """
+        if strategy == "dfs":
+            return StackFrontier()
+        elif strategy == "bfs":
+            return QueueFrontier()
+        elif strategy == "ucs":
+            return BucketFrontier(lambda node: node.cost)
+        elif strategy == "greedy":
+            return PriorityFrontier(lambda node: self.heuristic(node.state))
+        else:
+            return PriorityFrontier(
+                lambda node: (node.cost + self.heuristic(node.state), -node.cost)
+            )
 
 
     def output_image(self, filename, show_solution=True, show_explored=False):
-        from PIL import Image, ImageDraw
+        from PIL import Image
         cell_size = 50
         cell_border = 2
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.width * cell_size, self.height * cell_size),
-            "black"
-        )
-        draw = ImageDraw.Draw(img)
-
-        solution = self.solution[1] if self.solution is not None else None
-        for i, row in enumerate(self.walls):
-            for j, col in enumerate(row):
-
-                # Walls
-                if col:
-                    fill = (40, 40, 40)
-
-                # Start
-                elif (i, j) == self.start:
-                    fill = (255, 0, 0)
-
-                # Goal
-                elif (i, j) == self.goal:
-                    fill = (0, 171, 28)
-
-                # Solution
-                elif solution is not None and show_solution and (i, j) in solution:
-                    fill = (220, 235, 113)
-
-                # Explored
-                elif solution is not None and show_explored and (i, j) in self.explored:
-                    fill = (212, 97, 85)
-
-                # Empty cell
-                else:
-                    fill = (237, 240, 252)
-
-                # Draw cell
-                draw.rectangle(
-                    ([(j * cell_size + cell_border, i * cell_size + cell_border),
-                      ((j + 1) * cell_size - cell_border, (i + 1) * cell_size - cell_border)]),
-                    fill=fill
-                )
-
-        img.save(filename)
-
-
-if len(sys.argv) != 2:
-    sys.exit("Usage: python maze.py maze.txt")
-
-m = Maze(sys.argv[1])
-print("Maze:")
-m.print()
-print("Solving...")
-m.solve()
-print("States Explored:", m.num_explored)
-print("Solution:")
-m.print()
-m.output_image("maze.png", show_explored=True)
+        # Colour each cell, then blow every cell up to cell_size pixels
+        codes = self.cell_codes(show_solution, show_explored)
+        pixels = COLORS[codes]
+        pixels = np.repeat(np.repeat(pixels, cell_size, axis=0), cell_size, axis=1)
+
+        # Black out the border around each cell
+        offsets = np.arange(cell_size)
+        border = (offsets < cell_border) | (offsets > cell_size - cell_border)
+        pixels[np.tile(border, self.height), :, :3] = 0
+        pixels[:, np.tile(border, self.width), :3] = 0
+
+        Image.fromarray(pixels, "RGBA").save(filename)
+
+
+class LifelongPlanner():
+    """
+    Lifelong Planning A* (LPA*) from a maze's start to its goal.
+
+    Keeps g, the best known distance from the start to each state, and
+    rhs, the distance one step on from its best neighbour. States where
+    the two disagree are queued by (min(g, rhs) + distance to goal,
+    min(g, rhs)); a changed wall only makes its own cell and the cells
+    around it disagree, so a replan searches outward from there.
+    """
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.g = {}
+        self.rhs = {maze.start: 0}
+        self.queue = []
+
+        # Current key of each queued state; older heap entries are stale
+        self.keys = {}
+        self.push(maze.start)
+
+        self.num_explored = 0
+        self.explored = set()
+
+    def key(self, state):
+        cost = min(self.g.get(state, INFINITY), self.rhs.get(state, INFINITY))
+        return (cost + self.maze.distance(state), cost)
+
+    def push(self, state):
+        key = self.key(state)
+        self.keys[state] = key
+        heapq.heappush(self.queue, (key, state))
+
+    def update_state(self, state):
+        """
+        Recomputes rhs for a state and queues it if it is inconsistent.
+        """
+        maze = self.maze
+        if state != maze.start:
+            row, col = state
+            if maze.wall_bytes[row * maze.width + col]:
+                rhs = INFINITY
+            else:
+                rhs = min((self.g.get(neighbor, INFINITY) + 1
+                           for _, neighbor in maze.neighbors(state)),
+                          default=INFINITY)
+            self.rhs[state] = rhs
+        if self.g.get(state, INFINITY) != self.rhs.get(state, INFINITY):
+            self.push(state)
+        else:
+            self.keys.pop(state, None)
+
+    def update(self, cells):
+        """
+        Marks the states around cells whose walls changed for updating.
+        """
+        for cell in cells:
+            self.update_state(cell)
+            for _, neighbor in self.maze.neighbors(cell):
+                self.update_state(neighbor)
+
+    def compute(self):
+        """
+        Expands inconsistent states until the goal's distance is settled.
+        """
+        goal = self.maze.goal
+        self.num_explored = 0
+        self.explored = set()
+        while self.queue:
+            key, state = self.queue[0]
+            if self.keys.get(state) != key:
+                heapq.heappop(self.queue)
+                continue
+            if key >= self.key(goal) and \
+                    self.g.get(goal, INFINITY) == self.rhs.get(goal, INFINITY):
+                break
+            heapq.heappop(self.queue)
+            del self.keys[state]
+            self.num_explored += 1
+            self.explored.add(state)
+
+            # Overconsistent: the state got closer, so settle it
+            if self.g.get(state, INFINITY) > self.rhs[state]:
+                self.g[state] = self.rhs[state]
+
+            # Underconsistent: a wall cut it off, so start it over
+            else:
+                self.g[state] = INFINITY
+                self.update_state(state)
+            for _, neighbor in self.maze.neighbors(state):
+                self.update_state(neighbor)
+
+    def path(self):
+        """
+        Returns (actions, cells) from the start to the goal, walking back
+        from the goal through neighbours one step closer to the start.
+        """
+        maze = self.maze
+        state = maze.goal
+        if self.g.get(state, INFINITY) == INFINITY:
+            raise NoSolution("no solution")
+        actions = []
+        cells = []
+        while state != maze.start:
+            distance = self.g[state]
+            for _, neighbor in maze.neighbors(state):
+                if self.g.get(neighbor, INFINITY) == distance - 1:
+                    break
+            offset = (state[0] - neighbor[0], state[1] - neighbor[1])
+            actions.append(ACTIONS[offset])
+            cells.append(state)
+            state = neighbor
+        actions.reverse()
+        cells.reverse()
+        return (actions, cells)
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit(f"Usage: python maze.py maze.txt [{'|'.join(STRATEGIES)}]")
+    strategy = sys.argv[2] if len(sys.argv) == 3 else "dfs"
+    if strategy not in STRATEGIES:
+        sys.exit(f"Unknown strategy: {strategy}")
+
+    m = Maze(sys.argv[1])
+    print("Maze:")
+    m.print()
+    print("Solving...")
+    m.solve(strategy)
+    print("States Explored:", m.num_explored)
+    print("Solution:")
+    m.print()
+    m.output_image("maze.png", show_explored=True)
+
+
+if __name__ == "__main__":
+    main()
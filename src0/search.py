@@ -0,0 +1,224 @@
+import heapq
+import itertools
+import time
+from collections import deque
+
+
+class Node():
+    __slots__ = ("state", "parent", "action", "cost")
+
+    def __init__(self, state, parent, action, cost=0):
+        self.state = state
+        self.parent = parent
+        self.action = action
+        self.cost = cost
+
+
+class StackFrontier():
+    def __init__(self):
+        self.frontier = deque()
+
+        # Number of frontier nodes holding each state, for O(1) lookups
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.pop()
+            self.discard(node)
+            return node
+
+    def discard(self, node):
+        count = self.states[node.state] - 1
+        if count:
+            self.states[node.state] = count
+        else:
+            del self.states[node.state]
+
+
+class QueueFrontier(StackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = self.frontier.popleft()
+            self.discard(node)
+            return node
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that always removes the node with the lowest priority,
+    as given by calling `priority` on it. Ties go to the node added first.
+    """
+
+    def __init__(self, priority):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(
+            self.frontier, (self.priority(node), next(self.counter), node)
+        )
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = heapq.heappop(self.frontier)[2]
+            self.discard(node)
+            return node
+
+
+class BucketFrontier(StackFrontier):
+    """
+    Priority frontier for small non-negative integer priorities, such as
+    path costs with unit steps. Nodes go into one queue per priority, so
+    adding and removing are O(1) instead of O(log n). Ties go to the
+    node added first, as in PriorityFrontier.
+    """
+
+    def __init__(self, priority):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority
+        self.size = 0
+
+        # No bucket below this one holds any nodes
+        self.lowest = 0
+
+    def add(self, node):
+        priority = self.priority(node)
+        while len(self.frontier) <= priority:
+            self.frontier.append(deque())
+        self.frontier[priority].append(node)
+        self.lowest = min(self.lowest, priority)
+        self.size += 1
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def empty(self):
+        return self.size == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            while not self.frontier[self.lowest]:
+                self.lowest += 1
+            node = self.frontier[self.lowest].popleft()
+            self.size -= 1
+            self.discard(node)
+            return node
+
+
+class Problem():
+    """
+    What search() needs to know about a problem. Subclasses set `start`
+    and override neighbors(); step costs default to 1 and the heuristic
+    to 0, which makes A* a uniform cost search.
+    """
+
+    start = None
+
+    def is_goal(self, state):
+        raise NotImplementedError
+
+    def neighbors(self, state):
+        """
+        Returns (action, state) pairs reachable in one step.
+        """
+        raise NotImplementedError
+
+    def cost(self, state, action, result):
+        return 1
+
+    def heuristic(self, state):
+        return 0
+
+
+class Stats():
+    """
+    Counters and timing for one search: states expanded, nodes added to
+    the frontier, the set of states explored and the time taken.
+    """
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.explored = set()
+        self.seconds = 0.0
+
+
+def search(problem, frontier, stats=None):
+    """
+    Graph search from `problem.start` in the order `frontier` removes
+    nodes. Returns the goal Node, or None if no goal is reachable.
+
+    With a plain stack or queue a state is added once; with a priority
+    frontier it is added again whenever a cheaper path to it turns up,
+    and the stale copies are skipped when they come out.
+    """
+    stats = stats if stats is not None else Stats()
+    started = time.perf_counter()
+    prioritised = isinstance(frontier, (PriorityFrontier, BucketFrontier))
+    explored = stats.explored
+    best = {problem.start: 0}
+    frontier.add(Node(problem.start, None, None))
+    stats.generated += 1
+
+    try:
+        while not frontier.empty():
+            node = frontier.remove()
+            if node.state in explored:
+                continue
+            stats.expanded += 1
+            if problem.is_goal(node.state):
+                return node
+            explored.add(node.state)
+
+            for action, state in problem.neighbors(node.state):
+                if state in explored:
+                    continue
+                cost = node.cost + problem.cost(node.state, action, state)
+                if prioritised:
+                    if cost >= best.get(state, cost + 1):
+                        continue
+                    best[state] = cost
+                elif frontier.contains_state(state):
+                    continue
+                frontier.add(Node(state, node, action, cost))
+                stats.generated += 1
+        return None
+    finally:
+        stats.seconds += time.perf_counter() - started
+
+
+def solution(node):
+    """
+    Returns (actions, states) along the path from the start to a node,
+    not including the start state.
+    """
+    actions = []
+    states = []
+    while node.parent is not None:
+        actions.append(node.action)
+        states.append(node.state)
+        node = node.parent
+    actions.reverse()
+    states.reverse()
+    return (actions, states)
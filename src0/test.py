@@ -0,0 +1,105 @@
+import os
+import random
+import sys
+import tempfile
+
+from maze import DIRECTIONS, Maze, NoSolution
+
+# Checks Maze.replan() against fresh solves after random wall changes.
+# Equal-cost paths may differ cell by cell between LPA* and a fresh
+# search, so paths are checked for validity and length, not equality.
+
+
+def random_maze(rng, filename):
+    """
+    Writes a small random maze with walls on about a quarter of its cells.
+    """
+    height, width = rng.randint(2, 15), rng.randint(2, 15)
+    grid = [["#" if rng.random() < 0.25 else " " for _ in range(width)]
+            for _ in range(height)]
+    cells = [(i, j) for i in range(height) for j in range(width)]
+    start, goal = rng.sample(cells, 2)
+    grid[start[0]][start[1]] = "A"
+    grid[goal[0]][goal[1]] = "B"
+    with open(filename, "w") as f:
+        f.write("\n".join("".join(row) for row in grid))
+
+
+def check_path(maze):
+    """
+    Asserts the solution steps from the start to the goal through open
+    cells, with each action matching its step.
+    """
+    row, col = maze.start
+    for action, cell in zip(*maze.solution):
+        dr, dc = DIRECTIONS[action]
+        row, col = row + dr, col + dc
+        assert (row, col) == cell, f"{action} does not lead to {cell}"
+        assert not maze.walls[row, col], f"path goes through wall {cell}"
+    assert (row, col) == maze.goal, "path does not end at the goal"
+
+
+def path_length(maze, solve):
+    """
+    Returns the length of the path solve() finds, or None if it raises
+    NoSolution.
+    """
+    try:
+        solve()
+    except NoSolution:
+        return None
+    check_path(maze)
+    return len(maze.solution[0])
+
+
+def wall_in_goal(maze):
+    """
+    Walls every open cell next to the goal and returns those cells.
+    """
+    cells = [cell for _, cell in maze.neighbors(maze.goal)
+             if cell != maze.start]
+    for cell in cells:
+        maze.set_wall(cell)
+    return cells
+
+
+def check_maze(rng, filename, rounds=30):
+    """
+    Replans after each round of random wall changes and compares with
+    fresh A* and BFS solves. Halfway through, the goal is walled in to
+    check the unsolvable case, then opened again.
+    """
+    maze = Maze(filename)
+    blocked = []
+    for step in range(rounds):
+        if step == rounds // 2:
+            blocked = wall_in_goal(maze)
+        elif step == rounds // 2 + 1:
+            for cell in blocked:
+                maze.set_wall(cell, False)
+        elif step:
+            for _ in range(rng.randint(1, 4)):
+                cell = (rng.randrange(maze.height), rng.randrange(maze.width))
+                if cell not in (maze.start, maze.goal):
+                    maze.set_wall(cell, rng.random() < 0.5)
+
+        replanned = path_length(maze, maze.replan)
+        astar = path_length(maze, lambda: maze.solve("astar"))
+        bfs = path_length(maze, lambda: maze.solve("bfs"))
+        assert replanned == astar == bfs, \
+            f"round {step}: replan {replanned}, astar {astar}, bfs {bfs}"
+
+
+def main():
+    mazes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "maze.txt")
+        for _ in range(mazes):
+            random_maze(rng, filename)
+            check_maze(rng, filename)
+    print(f"replan() matched fresh solves on {mazes} mazes")
+
+
+if __name__ == "__main__":
+    main()